@@ -0,0 +1,155 @@
+"""
+Analytics implementations against a seeded local mongod.
+
+Compares the original find() + Python Counter code with the server-side
+aggregation pipelines and the mood_daily rollups, reporting latency and
+bytes received from MongoDB per request. Seeds a throwaway database.
+
+Run from backend/ (needs a running mongod at MONGODB_URL):
+    python -m benchmarks.bench_analytics --sizes 10000,100000,1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+import database
+from config import settings
+from models.mood import ALLOWED_MOODS, MOOD_SCORES
+from routes.analytics import build_weekly_trend, build_mood_distribution
+from services.mood_rollups import backfill_rollups
+
+BENCH_DATABASE = "mindscope_bench"
+
+class ReplySizeListener(monitoring.CommandListener):
+    """Sums the BSON size of every server reply"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+async def legacy_weekly_trend(db, user_id: str) -> dict:
+    """Original implementation: full documents, bucketed in Python"""
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=7)
+    cursor = db.chat_logs.find({
+        "user_id": ObjectId(user_id),
+        "timestamp": {"$gte": start_date, "$lte": end_date}
+    }).sort("timestamp", 1)
+    
+    daily_data = {}
+    async for log in cursor:
+        daily_data.setdefault(log["timestamp"].strftime("%Y-%m-%d"), []).append(log["mood"])
+    
+    trend = []
+    for i in range(7):
+        date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+        moods = daily_data.get(date)
+        dominant = Counter(moods).most_common(1)[0][0] if moods else None
+        trend.append({"date": date, "mood": dominant, "score": MOOD_SCORES.get(dominant, 0)})
+    return {"trend": trend}
+
+async def legacy_mood_distribution(db, user_id: str, days: int = 30) -> dict:
+    """Original implementation: full documents, counted in Python"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    cursor = db.chat_logs.find({"user_id": ObjectId(user_id), "timestamp": {"$gte": start_date}})
+    
+    mood_counts = Counter()
+    async for log in cursor:
+        mood_counts[log["mood"]] += 1
+    return dict(mood_counts)
+
+async def seed(db, user_id: ObjectId, size: int):
+    await db.chat_logs.drop()
+    await db.mood_daily.drop()
+    await db.chat_logs.create_index([("user_id", 1), ("timestamp", -1)])
+    await db.mood_daily.create_index([("user_id", 1), ("date", 1)], unique=True)
+    
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    batch = []
+    for _ in range(size):
+        batch.append({
+            "user_id": user_id,
+            "message": "Some days are harder than others and today was one of them. " * 2,
+            "mood": rng.choice(ALLOWED_MOODS),
+            "confidence": round(rng.uniform(0.5, 1.0), 2),
+            "ai_reply": "I hear you. It's okay to feel this way, and I'm here with you. " * 3,
+            "timestamp": now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        })
+        if len(batch) == 10000:
+            await db.chat_logs.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.chat_logs.insert_many(batch, ordered=False)
+    await backfill_rollups(db, user_id, cutoff=datetime.max)  # no live writes: rebuild every day
+
+async def measure(listener: ReplySizeListener, call, repeat: int) -> tuple:
+    timings = []
+    listener.bytes = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, listener.bytes / repeat
+
+async def run(sizes: list, repeat: int):
+    listener = ReplySizeListener()
+    client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[listener])
+    db = client[BENCH_DATABASE]
+    database.db.client, database.db.db, database.db.analytics_db = client, db, db
+    
+    user_id = ObjectId()
+    uid = str(user_id)
+    
+    async def new_trend():
+        await build_weekly_trend(uid, datetime.utcnow())
+    
+    async def new_distribution():
+        await build_mood_distribution(uid, 30, datetime.utcnow() - timedelta(days=30))
+    
+    print(f"{'logs':>9}  {'endpoint':<18}{'impl':<12}{'p50 (ms)':>10}{'KiB received':>14}")
+    for size in sizes:
+        await seed(db, user_id, size)
+        cases = [
+            ("weekly-trend", "legacy", lambda: legacy_weekly_trend(db, uid), None),
+            ("weekly-trend", "aggregate", new_trend, False),
+            ("weekly-trend", "rollups", new_trend, True),
+            ("distribution", "legacy", lambda: legacy_mood_distribution(db, uid), None),
+            ("distribution", "aggregate", new_distribution, False),
+            ("distribution", "rollups", new_distribution, True),
+        ]
+        for endpoint, impl, call, use_rollups in cases:
+            if use_rollups is not None:
+                settings.ANALYTICS_USE_ROLLUPS = use_rollups
+            p50, received = await measure(listener, call, repeat)
+            print(f"{size:>9}  {endpoint:<18}{impl:<12}{p50:>10.1f}{received / 1024:>14.1f}")
+    
+    await client.drop_database(BENCH_DATABASE)
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated chat_logs counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run([int(size) for size in args.sizes.split(",")], args.repeat))
+
+if __name__ == "__main__":
+    main()
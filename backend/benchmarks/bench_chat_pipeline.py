@@ -0,0 +1,42 @@
+"""
+Compare /chat/send pipeline modes against a stub LLM with injected latency.
+
+Run from backend/:
+    python -m benchmarks.bench_chat_pipeline --latency 0.3 --messages 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_llm import install_stub_backend
+from config import settings
+from services.chat_pipeline import process_message
+
+async def run_mode(mode: str, messages: int) -> list:
+    settings.CHAT_PIPELINE_MODE = mode
+    timings = []
+    for i in range(messages):
+        start = time.perf_counter()
+        await process_message(f"I have so much work due tomorrow ({i})")
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per LLM call")
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    backend = install_stub_backend(args.latency)
+
+    print(f"{'mode':<12}{'p50 (ms)':>10}{'p95 (ms)':>10}{'llm calls':>11}")
+    for mode in ("sequential", "combined"):
+        backend.calls = 0
+        timings = asyncio.run(run_mode(mode, args.messages))
+        p50 = statistics.median(timings) * 1000
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1] * 1000
+        print(f"{mode:<12}{p50:>10.1f}{p95:>10.1f}{backend.calls:>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Time-to-first-byte of /chat/send versus /chat/stream with a fake
+streaming LLM backend.
+
+Run from backend/:
+    python -m benchmarks.bench_chat_stream --latency 0.4 --messages 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_llm import install_stub_backend
+from config import settings
+from routes.chat import chat_event_stream
+from services.chat_pipeline import process_message
+from services.mood_classifier import classify_mood
+
+class NullCollection:
+    async def insert_one(self, document):
+        pass
+    
+    async def update_one(self, filter, update, upsert=False):
+        pass
+
+class NullDatabase:
+    chat_logs = NullCollection()
+    mood_daily = NullCollection()
+
+USER_ID = "65a000000000000000000000"
+
+async def measure_send(message: str) -> tuple:
+    start = time.perf_counter()
+    await process_message(message)
+    elapsed = time.perf_counter() - start
+    # The whole body arrives at once
+    return elapsed, elapsed
+
+async def measure_stream(message: str) -> tuple:
+    start = time.perf_counter()
+    mood_result = await classify_mood(message)
+    first_byte = None
+    async for _ in chat_event_stream(NullDatabase(), USER_ID, message, mood_result):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+    return first_byte, time.perf_counter() - start
+
+async def run(measure, messages: int) -> tuple:
+    ttfb, total = [], []
+    for i in range(messages):
+        # Unique text so neither run is served from the classification cache
+        first, full = await measure(f"the weather changed again today ({measure.__name__} {i})")
+        ttfb.append(first)
+        total.append(full)
+    return statistics.median(ttfb) * 1000, statistics.median(total) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per LLM call")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--messages", type=int, default=10)
+    args = parser.parse_args()
+    
+    install_stub_backend(args.latency, args.chunk_delay)
+    # Every message must reach the LLM for a fair comparison
+    settings.LOCAL_CLASSIFIER_ENABLED = False
+    
+    print(f"{'endpoint':<14}{'p50 TTFB (ms)':>15}{'p50 total (ms)':>16}")
+    for name, measure in (("/chat/send", measure_send), ("/chat/stream", measure_stream)):
+        ttfb, total = asyncio.run(run(measure, args.messages))
+        print(f"{name:<14}{ttfb:>15.1f}{total:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Classification throughput with and without micro-batching, against a
+stub LLM whose concurrency is capped like a real rate-limited backend.
+
+Run from backend/:
+    python -m benchmarks.bench_classify_batching --messages 400 --concurrency 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.stub_llm import install_stub_backend
+from config import settings
+from services import mood_classifier
+
+async def run(messages: int, concurrency: int, tag: str) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def classify(i: int):
+        async with semaphore:
+            # Unique text: no cache hits, no local fast path
+            await mood_classifier.classify_mood(f"the weather changed ({tag} {i})")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(classify(i) for i in range(messages)))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100, help="simultaneous requests")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per LLM call")
+    parser.add_argument("--llm-limit", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--window-ms", type=float, default=settings.CLASSIFY_BATCH_WINDOW_MS)
+    parser.add_argument("--batch-size", type=int, default=settings.CLASSIFY_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+    
+    backend = install_stub_backend(args.latency)
+    settings.LOCAL_CLASSIFIER_ENABLED = False
+    settings.LLM_MAX_CONCURRENCY = args.llm_limit
+    settings.LLM_QUEUE_TIMEOUT = 3600
+    settings.CLASSIFY_BATCH_WINDOW_MS = args.window_ms
+    settings.CLASSIFY_BATCH_MAX_SIZE = args.batch_size
+    
+    print(f"{'mode':<10}{'msgs/s':>10}{'llm calls':>11}{'avg batch':>11}")
+    for batching in (False, True):
+        settings.CLASSIFY_BATCH_ENABLED = batching
+        backend.calls = 0
+        elapsed = asyncio.run(run(args.messages, args.concurrency, str(batching)))
+        avg_batch = mood_classifier.get_batcher().stats()["avg_batch_size"] if batching else 1.0
+        mood_classifier._batcher = None
+        name = "batched" if batching else "single"
+        print(f"{name:<10}{args.messages / elapsed:>10.1f}{backend.calls:>11}{avg_batch:>11}")
+
+if __name__ == "__main__":
+    main()
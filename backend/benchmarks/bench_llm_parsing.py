@@ -0,0 +1,132 @@
+"""
+Correctness, fuzz and speed checks for the LLM response parser on a
+corpus of recorded raw Gemini responses (benchmarks/data/raw_responses.jsonl).
+
+- corpus: moods recovered by the original fence-stripping parser vs
+  services.llm_parsing (expected_mood null = must be rejected)
+- fuzz: random prose/fence/whitespace/trailing-comma wrapping must still
+  parse, and random corruption must only ever raise LLMParseError
+- speed: microseconds per response for both parsers
+
+Run from backend/:
+    python -m benchmarks.bench_llm_parsing --fuzz 5000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from models.mood import ALLOWED_MOODS, MoodClassification
+from services.llm_parsing import LLMParseError, parse_llm_json
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "raw_responses.jsonl")
+
+def legacy_parse(response_text: str) -> str:
+    """Original classify_mood parsing"""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    result = json.loads(response_text.strip())
+    mood = result.get("mood", "Neutral")
+    return mood if mood in ALLOWED_MOODS else "Neutral"
+
+def new_parse(response_text: str) -> str:
+    return parse_llm_json(response_text, MoodClassification, "bench", "corpus").mood
+
+def outcome(parse, raw: str):
+    try:
+        return parse(raw)
+    except Exception:
+        return None
+
+def check_corpus(rows: list):
+    print(f"{'parser':<10}{'correct':>9}{'of':>5}")
+    for name, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        correct = sum(outcome(parse, row["raw"]) == row["expected_mood"] for row in rows)
+        print(f"{name:<10}{correct:>9}{len(rows):>5}")
+    for row in rows:
+        got = outcome(new_parse, row["raw"])
+        if got != row["expected_mood"]:
+            print(f"  MISMATCH new parser: expected {row['expected_mood']!r}, got {got!r}: {row['raw'][:60]!r}")
+
+WRAPPERS = [
+    lambda s: f"Here you go:\n{s}",
+    lambda s: f"{s}\nHope this helps!",
+    lambda s: f"```json\n{s}\n```",
+    lambda s: f"```\n{s}\n```",
+    lambda s: f"Result:\n```json\n{s}\n```\nThanks.",
+    lambda s: f"  \n\t{s}  \n",
+    lambda s: s[:-1].rstrip().rstrip(",") + ",\n}",
+    lambda s: f"[{s}]",
+]
+
+def corrupt(text: str, rng: random.Random) -> str:
+    chars = list(text)
+    for _ in range(rng.randint(1, 5)):
+        op = rng.random()
+        position = rng.randrange(len(chars) + 1)
+        if op < 0.4 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif op < 0.8:
+            chars.insert(position, rng.choice('{}[]",:\\` \nabc'))
+        else:
+            chars = chars[:position]
+    return "".join(chars)
+
+def fuzz(rows: list, iterations: int, seed: int):
+    rng = random.Random(seed)
+    valid = [row for row in rows if row["expected_mood"] and row["raw"].lstrip().startswith("{")]
+    wrapped_ok = wrapped_total = crashes = 0
+    for _ in range(iterations):
+        row = rng.choice(valid)
+        
+        # Benign wrapping must still recover the same mood
+        wrapped = rng.choice(WRAPPERS)(row["raw"].strip())
+        wrapped_total += 1
+        wrapped_ok += outcome(new_parse, wrapped) == row["expected_mood"]
+        
+        # Corruption may fail, but only with LLMParseError
+        try:
+            new_parse(corrupt(row["raw"], rng))
+        except LLMParseError:
+            pass
+        except Exception as e:
+            crashes += 1
+            print(f"  CRASH {type(e).__name__}: {e}")
+    
+    print(f"fuzz: {wrapped_ok}/{wrapped_total} wrapped responses recovered, {crashes} unexpected exceptions")
+
+def bench(rows: list, repeat: int):
+    parseable = [
+        row["raw"] for row in rows
+        if outcome(legacy_parse, row["raw"]) is not None and outcome(new_parse, row["raw"]) is not None
+    ]
+    print(f"speed on {len(parseable)} responses both parsers accept:")
+    for name, parse in (("legacy", legacy_parse), ("new", new_parse)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for raw in parseable:
+                parse(raw)
+        per_call = (time.perf_counter() - start) / (repeat * len(parseable)) * 1e6
+        print(f"  {name:<8}{per_call:>8.2f} us/response")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--fuzz", type=int, default=5000, help="fuzz iterations")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    with open(args.corpus) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    
+    check_corpus(rows)
+    fuzz(rows, args.fuzz, args.seed)
+    bench(rows, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Evaluate the local mood classifier tier against LLM labels.
+
+Reports the hit rate (messages answered without the LLM), agreement with
+the LLM label on those hits, and per-message latency. Labels come from a
+JSONL file of {message, mood} or from chat_logs. Before timing, it checks
+that none of CRISIS_MESSAGES could be answered by the local tier as
+anything but Critical, and exits if one would be.
+
+Run from backend/:
+    python -m benchmarks.bench_local_classifier --data labels.jsonl
+    python -m benchmarks.bench_local_classifier --holdout 0.2   # train/test split of chat_logs
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_database
+from manage import read_jsonl
+from services.local_classifier import LocalMoodClassifier, load_labeled_messages
+from services.mood_classifier import is_critical
+
+# Self-harm-adjacent phrasings a trained model happily labels Angry, Sad or
+# even Happy with high confidence; the keyword screen must catch them first
+CRISIS_MESSAGES = [
+    "I hate myself",
+    "I hate my life",
+    "nobody would care if I was gone",
+    "would anyone even notice if I were dead",
+    "everyone would be fine without me",
+    "they'd all be better off without me",
+    "I wish I was never born",
+    "I want to die",
+]
+
+async def load_from_db(limit: int) -> list:
+    await connect_to_mongo()
+    try:
+        return await load_labeled_messages(get_database(), limit)
+    finally:
+        await close_mongo_connection()
+
+def check_crisis_screen(model: LocalMoodClassifier, threshold: float):
+    for message in CRISIS_MESSAGES:
+        if is_critical(message):
+            continue
+        mood, confidence = model.predict(message)
+        if mood is not None and confidence >= threshold:
+            raise SystemExit(f"Crisis message answered locally: {message!r} -> {mood} ({confidence:.2f})")
+
+def evaluate(model: LocalMoodClassifier, samples: list, threshold: float) -> dict:
+    hits = agree = 0
+    timings = []
+    for message, llm_mood in samples:
+        start = time.perf_counter()
+        mood, confidence = model.predict(message)
+        timings.append(time.perf_counter() - start)
+        if mood is not None and confidence >= threshold:
+            hits += 1
+            agree += mood == llm_mood
+    
+    timings.sort()
+    return {
+        "messages": len(samples),
+        "hit_rate": hits / len(samples) if samples else 0.0,
+        "agreement": agree / hits if hits else 0.0,
+        "p50_us": statistics.median(timings) * 1e6 if timings else 0.0,
+        "p99_us": timings[int(len(timings) * 0.99) - 1] * 1e6 if timings else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", help="JSONL of {message, mood}; defaults to chat_logs")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--holdout", type=float, default=0.0,
+                        help="train a fresh model on the rest and evaluate on this fraction")
+    parser.add_argument("--threshold", type=float, default=settings.LOCAL_CLASSIFIER_THRESHOLD)
+    args = parser.parse_args()
+    
+    if args.data:
+        samples = [(row["message"], row["mood"]) for row in read_jsonl(args.data)]
+    else:
+        samples = asyncio.run(load_from_db(args.limit))
+    
+    if args.holdout:
+        random.Random(0).shuffle(samples)
+        split = int(len(samples) * (1 - args.holdout))
+        model = LocalMoodClassifier.train(samples[:split])
+        samples = samples[split:]
+    else:
+        model = LocalMoodClassifier.load(settings.LOCAL_CLASSIFIER_PATH)
+    
+    kind = "trained" if model.trained else "lexicon"
+    check_crisis_screen(model, args.threshold)
+    result = evaluate(model, samples, args.threshold)
+    print(f"model: {kind}   threshold: {args.threshold}")
+    print(f"messages:  {result['messages']}")
+    print(f"hit rate:  {result['hit_rate']:.1%}")
+    print(f"agreement: {result['agreement']:.1%}")
+    print(f"latency:   p50 {result['p50_us']:.1f} us   p99 {result['p99_us']:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Login throughput and its impact on concurrent chat latency, with bcrypt
+verified inline on the event loop (before) versus in the worker pool (after).
+
+A simulated /chat/send (one awaited 50 ms stub LLM call) runs in a loop
+while a storm of logins is verified; its latency shows how much bcrypt
+stalls everything else in the worker.
+
+Run from backend/:
+    python -m benchmarks.bench_login --logins 40 --concurrency 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from services import password_hasher
+from services.password_hasher import pwd_context
+
+CHAT_LLM_LATENCY = 0.05
+
+async def verify_inline(password: str, hashed: str):
+    # Original behaviour: synchronous bcrypt inside async def login
+    return pwd_context.verify(password, hashed)
+
+async def verify_pooled(password: str, hashed: str):
+    return await password_hasher.verify_password(password, hashed)
+
+async def chat_loop(stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(CHAT_LLM_LATENCY)
+        latencies.append(time.perf_counter() - start)
+
+async def run(verify, hashed: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def login():
+        async with semaphore:
+            await verify("secret123", hashed)
+    
+    stop = asyncio.Event()
+    latencies = []
+    chats = [asyncio.create_task(chat_loop(stop, latencies)) for _ in range(4)]
+    await asyncio.sleep(0)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    
+    stop.set()
+    await asyncio.gather(*chats)
+    latencies.sort()
+    return {
+        "logins_per_s": logins / elapsed,
+        "chat_p50_ms": statistics.median(latencies) * 1000,
+        "chat_p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    
+    hashed = pwd_context.hash("secret123")
+    print(f"bcrypt rounds: {pwd_context.to_dict().get('bcrypt__default_rounds')}   "
+          f"pool workers: {password_hasher._executor._max_workers}")
+    print(f"{'mode':<10}{'logins/s':>10}{'chat p50 (ms)':>15}{'chat p99 (ms)':>15}")
+    for name, verify in (("inline", verify_inline), ("pooled", verify_pooled)):
+        result = asyncio.run(run(verify, hashed, args.logins, args.concurrency))
+        print(f"{name:<10}{result['logins_per_s']:>10.1f}{result['chat_p50_ms']:>15.1f}{result['chat_p99_ms']:>15.1f}")
+    password_hasher.shutdown()
+
+if __name__ == "__main__":
+    main()
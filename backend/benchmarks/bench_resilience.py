@@ -0,0 +1,70 @@
+"""
+Resilience of the LLM layer against a fault-injecting stub backend.
+
+outage: the backend fails every call for a while and then recovers.
+        Shows per-request latency dropping to ~0 once the breaker trips
+        (static fallbacks), and the breaker closing again after recovery.
+tail:   a share of calls is very slow; compares p50/p99 with and
+        without hedged requests.
+
+Run from backend/:
+    python -m benchmarks.bench_resilience outage
+    python -m benchmarks.bench_resilience tail --slow-rate 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_llm import install_stub_backend
+from config import settings
+from services import llm_client
+from services.ai_responder import generate_response
+
+async def timed_reply(i: int) -> float:
+    start = time.perf_counter()
+    await generate_response(f"message {i}", "Sad", 0.8)
+    return time.perf_counter() - start
+
+async def outage(args):
+    backend = install_stub_backend(args.latency, error_rate=1.0)
+    llm_client.breaker.recovery_time = args.recovery
+    
+    print(f"{'phase':<10}{'req':>5}{'latency (ms)':>14}{'circuit':>11}")
+    for i in range(args.requests):
+        if i == args.requests // 2:
+            backend.error_rate = 0.0
+            await asyncio.sleep(args.recovery)
+        phase = "outage" if i < args.requests // 2 else "recovered"
+        elapsed = await timed_reply(i)
+        print(f"{phase:<10}{i:>5}{elapsed * 1000:>14.1f}{llm_client.breaker.state:>11}")
+    print(llm_client.stats())
+
+async def tail(args):
+    for hedge_after in (0.0, args.hedge_after):
+        install_stub_backend(args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=1)
+        settings.LLM_HEDGE_AFTER = hedge_after
+        timings = sorted(await asyncio.gather(*(timed_reply(i) for i in range(args.requests))))
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        name = f"hedge@{hedge_after}s" if hedge_after else "no hedge"
+        print(f"{name:<14} p50 {statistics.median(timings) * 1000:>8.1f} ms   p99 {p99 * 1000:>8.1f} ms")
+    print(llm_client.stats())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenario", choices=["outage", "tail"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--recovery", type=float, default=1.0, help="breaker open time (outage)")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="share of slow calls (tail)")
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    args = parser.parse_args()
+    
+    settings.LLM_MAX_CONCURRENCY = max(settings.LLM_MAX_CONCURRENCY, args.requests)
+    if args.scenario == "outage":
+        args.requests = min(args.requests, 24)
+    asyncio.run(outage(args) if args.scenario == "outage" else tail(args))
+
+if __name__ == "__main__":
+    main()
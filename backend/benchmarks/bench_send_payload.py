@@ -0,0 +1,92 @@
+"""
+Serialization cost of one /chat/send response body.
+
+"legacy" rebuilds the theme/suggestion dicts from MOOD_THEMES and
+MOOD_SUGGESTIONS for every message, copies them into the response and
+lets FastAPI validate and encode the returned dict (response_model=dict
+-> serialize_response -> JSONResponse). "presentation" assembles the
+response from the precomputed theme_mapper payloads and encodes it with
+ORJSONResponse. Both bodies are checked to decode to the same JSON.
+
+Run from backend/:
+    python -m benchmarks.bench_send_payload --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models.mood import ALLOWED_MOODS, MOOD_THEMES, MOOD_SUGGESTIONS, MOOD_QUOTES
+from routes.chat import build_mood_payload
+from services.mood_classifier import build_mood_result
+
+REPLY = "I hear you. It's okay to feel this way, and I'm here with you. " * 3
+
+def legacy_mood_result(mood: str, confidence: float, quote: str) -> dict:
+    theme_info = MOOD_THEMES.get(mood, MOOD_THEMES["Neutral"])
+    suggestions = MOOD_SUGGESTIONS.get(mood, MOOD_SUGGESTIONS["Neutral"])
+    return {
+        "mood": mood, "confidence": confidence, "quote": quote,
+        "ui_theme": theme_info["theme"], "background_gradient": theme_info["gradient"],
+        "emoji": theme_info["emoji"], "suggestions": suggestions, "source": "llm"
+    }
+
+def legacy_payload(mood_result: dict) -> dict:
+    return {
+        "mood": {
+            "detected": mood_result["mood"], "confidence": mood_result["confidence"],
+            "emoji": mood_result["emoji"], "quote": mood_result["quote"]
+        },
+        "ui": {"theme": mood_result["ui_theme"], "background_gradient": mood_result["background_gradient"]},
+        "suggestions": mood_result["suggestions"]
+    }
+
+def envelope(message: str, payload: dict, timestamp: str) -> dict:
+    return {"success": True, "data": {"user_message": message, "ai_response": REPLY, **payload, "timestamp": timestamp}}
+
+async def run(iterations: int, seed: int):
+    rng = random.Random(seed)
+    moods = [rng.choice(ALLOWED_MOODS) for _ in range(iterations)]
+    timestamp = datetime.utcnow().isoformat()
+    message = "Deadlines everywhere, I'm totally stressed"
+    field = create_response_field(name="Response_send_message", type_=dict)
+
+    async def legacy(mood: str) -> bytes:
+        content = envelope(message, legacy_payload(legacy_mood_result(mood, 0.82, MOOD_QUOTES[mood])), timestamp)
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    async def presentation(mood: str) -> bytes:
+        content = envelope(message, build_mood_payload(build_mood_result(mood, 0.82, MOOD_QUOTES[mood])), timestamp)
+        return ORJSONResponse(content).body
+
+    for mood in ALLOWED_MOODS:
+        if json.loads(await legacy(mood)) != json.loads(await presentation(mood)):
+            raise SystemExit(f"Response bodies differ for {mood}")
+
+    print(f"{'impl':<14}{'us/response':>13}{'bytes':>8}")
+    results = {}
+    for name, build in (("legacy", legacy), ("presentation", presentation)):
+        for mood in moods[:1000]:  # warm-up
+            await build(mood)
+        start = time.perf_counter()
+        for mood in moods:
+            body = await build(mood)
+        results[name] = (time.perf_counter() - start) / iterations * 1e6
+        print(f"{name:<14}{results[name]:>13.2f}{len(body):>8}")
+    print(f"\nspeedup: {results['legacy'] / results['presentation']:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Trend metrics: per-day Python loops vs the vectorized NumPy engine.
+
+The loop version computes the same metrics the way the weekly-trend
+endpoint does - one user at a time, one day at a time, over dicts of
+daily counts. Both run on the same synthetic daily series (no MongoDB),
+and their results are checked against each other before timing.
+
+Run from backend/:
+    python -m benchmarks.bench_trends --users 1,100,10000 --days 90
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from models.mood import ALLOWED_MOODS, MOOD_SCORES
+from services.mood_trends import DailySeries, trend_metrics
+
+def synthetic_series(users: int, days: int, seed: int = 1) -> tuple:
+    """Daily mood Counters per user (as the loop code sees them) and the same data as a DailySeries"""
+    rng = random.Random(seed)
+    daily_counts = []
+    scores = np.full((users, days), np.nan)
+    entries = np.zeros((users, days), dtype=np.int64)
+    for row in range(users):
+        activity = rng.uniform(0.2, 0.9)
+        user_days = []
+        for column in range(days):
+            counts = {}
+            if rng.random() < activity:
+                for _ in range(rng.randint(1, 5)):
+                    mood = rng.choice(ALLOWED_MOODS)
+                    counts[mood] = counts.get(mood, 0) + 1
+                total = sum(counts.values())
+                entries[row, column] = total
+                scores[row, column] = sum(MOOD_SCORES[mood] * n for mood, n in counts.items()) / total
+            user_days.append(counts)
+        daily_counts.append(user_days)
+    series = DailySeries([str(row) for row in range(users)], [str(column) for column in range(days)], scores, entries)
+    return daily_counts, series
+
+def loop_metrics(user_days: list, smooth: int = 7) -> dict:
+    """One user's metrics with plain Python loops"""
+    scores = []
+    for counts in user_days:
+        total = sum(counts.values())
+        scores.append(sum(MOOD_SCORES[mood] * n for mood, n in counts.items()) / total if total else None)
+
+    active = [(day, score) for day, score in enumerate(scores) if score is not None]
+    values = [score for _, score in active]
+    average = sum(values) / len(values) if values else None
+    volatility = math.sqrt(sum((v - average) ** 2 for v in values) / len(values)) if values else None
+
+    rolling = []
+    for day in range(len(scores)):
+        recent = [s for s in scores[max(0, day - smooth + 1):day + 1] if s is not None]
+        rolling.append(sum(recent) / len(recent) if recent else None)
+
+    slope = None
+    if len(active) > 1:
+        x_mean = sum(day for day, _ in active) / len(active)
+        numerator = sum((day - x_mean) * (score - average) for day, score in active)
+        denominator = sum((day - x_mean) ** 2 for day, _ in active)
+        slope = numerator / denominator * 7 if denominator else None
+
+    longest = run = low_longest = low_run = 0
+    for score in scores:
+        run = run + 1 if score is not None else 0
+        low_run = low_run + 1 if score is not None and score < 0 else 0
+        longest, low_longest = max(longest, run), max(low_longest, low_run)
+    current = run if scores[-1] is not None else 0
+    if scores[-1] is None:
+        for score in reversed(scores[:-1]):
+            if score is None:
+                break
+            current += 1
+
+    return {"average_score": average, "volatility": volatility, "slope_per_week": slope,
+            "rolling": rolling, "longest_streak": longest, "current_streak": current,
+            "longest_low_streak": low_longest}
+
+def check_agreement(daily_counts: list, series: DailySeries, smooth: int):
+    vectorized = trend_metrics(series, smooth)
+    for row, user_days in enumerate(daily_counts[:200]):
+        expected = loop_metrics(user_days, smooth)
+        for name, value in expected.items():
+            actual = vectorized[name][row]
+            expected_values = np.array(value if isinstance(value, list) else [value], dtype=np.float64)
+            actual_values = np.atleast_1d(np.asarray(actual, dtype=np.float64))
+            if not np.allclose(expected_values, actual_values, equal_nan=True):
+                raise SystemExit(f"Mismatch for user {row}, {name}: loop {value} vs numpy {actual}")
+
+def timed(call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", default="1,100,10000", help="comma-separated cohort sizes")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--smooth", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'users':>7}{'days':>6}{'loops (ms)':>14}{'numpy (ms)':>14}{'speedup':>10}")
+    for users in (int(size) for size in args.users.split(",")):
+        daily_counts, series = synthetic_series(users, args.days)
+        check_agreement(daily_counts, series, args.smooth)
+        loops = timed(lambda: [loop_metrics(user_days, args.smooth) for user_days in daily_counts], args.repeat)
+        vectorized = timed(lambda: trend_metrics(series, args.smooth), args.repeat)
+        print(f"{users:>7}{args.days:>6}{loops:>14.2f}{vectorized:>14.2f}{loops / vectorized:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Load test the full FastAPI app with a stub LLM and mongomock or a local mongod.
+
+The app runs in-process (its real lifespan, middleware and routes) behind
+httpx's ASGI transport; N concurrent clients drive a weighted mix of
+endpoints for a fixed duration. Reports p50/p95/p99 latency, throughput
+and event-loop lag, and writes them as JSON to diff between commits.
+
+Run from backend/ (mongomock needs `pip install mongomock-motor`):
+    python -m benchmarks.load_test --concurrency 32 --duration 20 --output before.json
+    python -m benchmarks.load_test --mongodb-url mongodb://localhost:27017 --seed-logs 5000
+    python -m benchmarks.load_test --baseline before.json --output after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+from bson import ObjectId
+from passlib.context import CryptContext
+
+import database
+from benchmarks.stub_llm import install_stub_backend
+from config import settings
+from models.mood import ALLOWED_MOODS
+from services.mood_rollups import backfill_rollups
+
+LOADTEST_DATABASE = "mindscope_loadtest"
+PASSWORD = "loadtest-password"
+
+DEFAULT_MIX = "login=1,send=3,history=4,trend=1,distribution=1"
+
+# With LOCAL_CLASSIFIER_ENABLED=true half of these are easy for the local
+# classifier and the rest reach the LLM
+MESSAGES = [
+    "I'm so tired and drained today",
+    "Feeling happy and grateful this morning",
+    "Deadlines everywhere, I'm totally stressed",
+    "I don't know what to make of the meeting earlier",
+    "Had a long talk with my sister about moving cities",
+    "Something about today feels off but I can't explain it",
+]
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def use_mongomock():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("mongomock is not installed: pip install mongomock-motor (or pass --mongodb-url)")
+    database.AsyncIOMotorClient = AsyncMongoMockClient
+
+async def seed(db, users: int, logs_per_user: int, rng: random.Random) -> list:
+    """Users sharing one password hash, each with logs over the last 30 days"""
+    await db.users.delete_many({})
+    await db.chat_logs.delete_many({})
+    await db.mood_daily.delete_many({})
+
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.BCRYPT_ROUNDS).hash(PASSWORD)
+    accounts = [
+        {"_id": ObjectId(), "name": f"Load {i}", "email": f"load{i}@example.com",
+         "hashed_password": hashed, "created_at": datetime.utcnow()}
+        for i in range(users)
+    ]
+    await db.users.insert_many(accounts)
+
+    now = datetime.utcnow()
+    for account in accounts:
+        batch = []
+        for _ in range(logs_per_user):
+            batch.append({
+                "user_id": account["_id"],
+                "message": rng.choice(MESSAGES),
+                "mood": rng.choice(ALLOWED_MOODS),
+                "confidence": round(rng.uniform(0.5, 1.0), 2),
+                "mood_source": "llm",
+                "ai_reply": "I hear you. It's okay to feel this way, and I'm here with you.",
+                "timestamp": now - timedelta(seconds=rng.randint(0, 30 * 86400))
+            })
+            if len(batch) == 5000:
+                await db.chat_logs.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            await db.chat_logs.insert_many(batch, ordered=False)
+    await backfill_rollups(db, cutoff=datetime.max)  # no live writes yet: rebuild every day
+    return accounts
+
+async def op_login(client, account, rng):
+    return await client.post("/auth/login", json={"email": account["email"], "password": PASSWORD})
+
+async def op_send(client, account, rng):
+    message = f"{rng.choice(MESSAGES)} #{rng.randint(0, 10**6)}"
+    return await client.post("/chat/send", json={"message": message}, headers=account["headers"])
+
+async def op_history(client, account, rng):
+    return await client.get("/chat/history", params={"limit": 20}, headers=account["headers"])
+
+async def op_trend(client, account, rng):
+    return await client.get("/analytics/weekly-trend", headers=account["headers"])
+
+async def op_distribution(client, account, rng):
+    return await client.get("/analytics/mood-distribution", headers=account["headers"])
+
+OPERATIONS = {
+    "login": op_login,
+    "send": op_send,
+    "history": op_history,
+    "trend": op_trend,
+    "distribution": op_distribution,
+}
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    """How late a sleep(interval) wakes up - time the loop spent blocked"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+async def client_worker(client, accounts, mix, deadline, results, seed):
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        account = rng.choice(accounts)
+        start = time.perf_counter()
+        try:
+            response = await OPERATIONS[name](client, account, rng)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        results.append((name, time.perf_counter() - start, status))
+
+async def run(args) -> dict:
+    import main
+    from routes import auth
+
+    # The harness hammers login from one address on purpose
+    auth.ip_limiter.limit = auth.email_limiter.limit = float("inf")
+    rng = random.Random(args.seed)
+
+    async with main.lifespan(main.app):
+        accounts = await seed(database.get_database(), args.users, args.seed_logs, rng)
+        for account in accounts:
+            token = auth.create_access_token({"user_id": str(account["_id"])})
+            account["headers"] = {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            # Warm-up: first-call costs (imports, model load) stay out of the numbers
+            await client_worker(client, accounts, args.mix, time.perf_counter() + args.warmup, [], args.seed)
+
+            results, lag_samples = [], []
+            stop = asyncio.Event()
+            monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*(
+                client_worker(client, accounts, args.mix, deadline, results, args.seed + i + 1)
+                for i in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await monitor
+
+        if args.mongodb_url:
+            await database.db.client.drop_database(LOADTEST_DATABASE)
+
+    errors = [status for _, _, status in results if not (isinstance(status, int) and status < 400)]
+    lag = sorted(lag_samples)
+    return {
+        "label": args.label,
+        "git_revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "config": {
+            "mongo": "mongod" if args.mongodb_url else "mongomock",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "users": args.users,
+            "seed_logs_per_user": args.seed_logs,
+            "llm_latency_s": args.llm_latency,
+            "llm_error_rate": args.llm_error_rate,
+            "llm_slow_rate": args.llm_slow_rate,
+            "pipeline_mode": settings.CHAT_PIPELINE_MODE,
+        },
+        "overall": {
+            **summarize([latency for _, latency, _ in results], elapsed),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        },
+        "operations": {
+            name: summarize([latency for op, latency, _ in results if op == name], elapsed)
+            for name in args.mix
+        },
+        "status_codes": dict(Counter(str(status) for _, _, status in results)),
+        "loop_lag_ms": {
+            "p50": round(percentile(lag, 50) * 1000, 2),
+            "p99": round(percentile(lag, 99) * 1000, 2),
+            "max": round(lag[-1] * 1000, 2) if lag else 0.0,
+        },
+    }
+
+def print_report(report: dict, baseline: dict = None):
+    def delta(current: float, before: float) -> str:
+        if not before:
+            return ""
+        return f" ({(current - before) / before * 100:+.0f}%)"
+
+    print(f"{'operation':<14}{'requests':>9}{'rps':>9}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}")
+    rows = [("overall", report["overall"])] + list(report["operations"].items())
+    for name, row in rows:
+        before = {}
+        if baseline:
+            before = baseline["overall"] if name == "overall" else baseline["operations"].get(name, {})
+        cells = [
+            f"{row[key]:.1f}{delta(row[key], before.get(key))}"
+            for key in ("p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:<14}{row['requests']:>9}{row['throughput_rps']:>9.1f}" + "".join(f"{cell:>16}" for cell in cells))
+
+    lag = report["loop_lag_ms"]
+    print(f"\nerrors: {report['overall']['errors']}  status codes: {report['status_codes']}")
+    print(f"event-loop lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations ({', '.join(OPERATIONS)})")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed-logs", type=int, default=200, help="chat logs seeded per user")
+    parser.add_argument("--mongodb-url", help="local mongod to use instead of mongomock (throwaway database)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM seconds per call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="", help="free text stored in the results")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="earlier JSON results to compare latencies against")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    if args.mongodb_url:
+        settings.MONGODB_URL = args.mongodb_url
+        settings.DATABASE_NAME = LOADTEST_DATABASE
+    else:
+        use_mongomock()
+    install_stub_backend(args.llm_latency, error_rate=args.llm_error_rate, slow_rate=args.llm_slow_rate, seed=args.seed)
+
+    report = asyncio.run(run(args))
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Local stand-in for the Gemini backend used by the benchmarks.
+
+Answers are picked from the prompt shape (classification JSON, combined
+JSON or plain reply) after an injected, non-blocking delay. Faults can be
+injected: a share of calls failing with 503, or a slow tail.
+"""
+import asyncio
+import json
+import random
+import re
+
+from google.api_core import exceptions as google_exceptions
+
+from services import llm_client
+
+STUB_MOOD = {"mood": "Stressed", "confidence": 0.82, "quote": "One step at a time."}
+STUB_REPLY = "That sounds like a lot to carry. Let's take it one step at a time."
+
+class StubBackend:
+    def __init__(
+        self,
+        latency: float = 0.5,
+        chunk_delay: float = 0.02,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 5.0,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def _inject(self, latency: float):
+        """Sleep like a real call, then maybe fail like one"""
+        if self._rng.random() < self.slow_rate:
+            latency = self.slow_latency
+        await asyncio.sleep(latency)
+        if self._rng.random() < self.error_rate:
+            raise google_exceptions.ServiceUnavailable("stub: injected backend error")
+
+    def answer(self, prompt: str) -> str:
+        batch = re.search(r"EACH of the (\d+) user messages", prompt)
+        if batch:
+            return json.dumps([{"id": i, **STUB_MOOD} for i in range(int(batch.group(1)))])
+        if '"reply"' in prompt:
+            return json.dumps({**STUB_MOOD, "reply": STUB_REPLY})
+        if "Output ONLY valid JSON" in prompt:
+            return "```json\n" + json.dumps(STUB_MOOD) + "\n```"
+        return STUB_REPLY
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await self._inject(self.latency)
+        return self.answer(prompt)
+
+    async def stream(self, prompt: str):
+        """First chunk after the injected latency, then one word per chunk_delay"""
+        self.calls += 1
+        await self._inject(self.latency / 2)
+        for word in self.answer(prompt).split(" "):
+            await asyncio.sleep(self.chunk_delay)
+            yield word + " "
+
+def install_stub_backend(latency: float = 0.5, chunk_delay: float = 0.02, **faults) -> StubBackend:
+    """Route every llm_client call to a shared stub backend"""
+    backend = StubBackend(latency, chunk_delay, **faults)
+    llm_client.set_backend(backend)
+    return backend
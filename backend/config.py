@@ -8,12 +8,133 @@ class Settings:
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = "mindscope_db"
     
+    # MongoDB client. Pools are per process: size MONGO_MAX_POOL_SIZE so
+    # that workers x MONGO_MAX_POOL_SIZE stays under the server's connection limit.
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))  # wait for a free connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")  # e.g. "zstd,snappy" (needs zstandard / python-snappy)
+    MONGO_WRITE_CONCERN: str = os.getenv("MONGO_WRITE_CONCERN", "1")  # "1", "majority", ...
+    MONGO_ANALYTICS_READ_PREFERENCE: str = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "primary")  # e.g. "secondaryPreferred" (analytics responses then skip the response cache)
+    MONGO_WARMUP_CONNECTIONS: int = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "5"))  # opened at startup; 0 disables
+    
+    # Server (python serve.py). Every worker is a separate process with its
+    # own MongoDB pool and LLM concurrency limit.
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    
+    # Caches and rate limits shared across workers: "memory" (per process) or "redis"
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    REDIS_KEY_PREFIX: str = os.getenv("REDIS_KEY_PREFIX", "mindscope")
+    
     # Google Gemini API
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    
+    # LLM spend estimate for /metrics (USD per 1K tokens, tokens estimated from text length)
+    LLM_COST_PER_1K_PROMPT_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_PROMPT_TOKENS", "0"))
+    LLM_COST_PER_1K_COMPLETION_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_COMPLETION_TOKENS", "0"))
+    
+    # LLM client limits
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "20"))  # overall deadline per call, retries included
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))  # wait for a slot, then 429
+    
+    # LLM resilience: retries, hedging, circuit breaker
+    LLM_MAX_ATTEMPTS: int = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+    LLM_ATTEMPT_TIMEOUT: float = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "10"))  # seconds per attempt
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2"))
+    LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "2"))
+    LLM_HEDGE_AFTER: float = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # seconds; 0 disables hedging
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RECOVERY: float = float(os.getenv("LLM_BREAKER_RECOVERY", "30"))  # seconds open before a probe
     
     # JWT Auth
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-this")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL: int = int(os.getenv("TOKEN_CACHE_TTL", "300"))  # seconds, never past the token's exp
+    
+    # Password hashing (changing the cost rehashes passwords on next login)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    
+    # Login / register rate limits (requests per window)
+    AUTH_RATE_WINDOW: int = int(os.getenv("AUTH_RATE_WINDOW", "60"))  # seconds
+    AUTH_RATE_LIMIT_PER_IP: int = int(os.getenv("AUTH_RATE_LIMIT_PER_IP", "30"))
+    AUTH_RATE_LIMIT_PER_EMAIL: int = int(os.getenv("AUTH_RATE_LIMIT_PER_EMAIL", "10"))
+
+    # Local mood classifier (skips the LLM for easy messages). Enable it once
+    # `python manage.py train-classifier` has written LOCAL_CLASSIFIER_PATH
+    LOCAL_CLASSIFIER_ENABLED: bool = os.getenv("LOCAL_CLASSIFIER_ENABLED", "false").lower() == "true"
+    LOCAL_CLASSIFIER_THRESHOLD: float = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.85"))
+    LOCAL_CLASSIFIER_PATH: str = os.getenv("LOCAL_CLASSIFIER_PATH", "data/mood_model.json")
+    
+    # Classification cache (mood/confidence/quote only, never the reply)
+    CLASSIFY_CACHE_SIZE: int = int(os.getenv("CLASSIFY_CACHE_SIZE", "10000"))
+    CLASSIFY_CACHE_TTL: int = int(os.getenv("CLASSIFY_CACHE_TTL", "3600"))  # seconds
+    CLASSIFY_CACHE_SHARED: bool = os.getenv("CLASSIFY_CACHE_SHARED", "false").lower() == "true"  # MongoDB tier
+    
+    # Micro-batching of LLM classifications (opt-in)
+    CLASSIFY_BATCH_ENABLED: bool = os.getenv("CLASSIFY_BATCH_ENABLED", "false").lower() == "true"
+    CLASSIFY_BATCH_WINDOW_MS: float = float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "10"))
+    CLASSIFY_BATCH_MAX_SIZE: int = int(os.getenv("CLASSIFY_BATCH_MAX_SIZE", "16"))
+    
+    # Analytics read from the mood_daily rollups. After deploying, run
+    # `python manage.py backfill-rollups --cutoff <time the new code went live>`:
+    # older logs have no rollup, newer ones are counted live, and re-runs are harmless
+    ANALYTICS_USE_ROLLUPS: bool = os.getenv("ANALYTICS_USE_ROLLUPS", "true").lower() == "true"
+    TREND_MAX_WINDOW: int = int(os.getenv("TREND_MAX_WINDOW", "365"))  # days, GET /analytics/trend?window=
+    TREND_DECLINE_THRESHOLD: float = float(os.getenv("TREND_DECLINE_THRESHOLD", "0.25"))  # score points per week, cohort stats
+    
+    # Conversation context for replies: last CONTEXT_TURNS turns plus a rolling
+    # summary, capped at CONTEXT_MAX_TOKENS (estimated) per prompt
+    CONTEXT_ENABLED: bool = os.getenv("CONTEXT_ENABLED", "true").lower() == "true"
+    CONTEXT_TURNS: int = int(os.getenv("CONTEXT_TURNS", "6"))
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "400"))
+    CONTEXT_SUMMARY_EVERY: int = int(os.getenv("CONTEXT_SUMMARY_EVERY", "4"))  # turns out of the window per summary update
+    CONTEXT_SUMMARY_MAX_TOKENS: int = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "120"))
+    CONTEXT_CACHE_SIZE: int = int(os.getenv("CONTEXT_CACHE_SIZE", "10000"))  # users, memory backend only
+    CONTEXT_CACHE_TTL: int = int(os.getenv("CONTEXT_CACHE_TTL", "1800"))  # seconds; 0 loads the window from chat_logs each turn
+    
+    # Chat log export (GET /analytics/export, python manage.py export-chats)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # rows per cursor batch / encoded chunk
+    
+    # Per-user cache of analytics and chat history responses (with ETags);
+    # saving a chat log bumps the user's version and invalidates them all
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # seconds; 0 disables (ETags still sent)
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "50000"))  # user views, memory backend only
+    
+    # Background job runner for deferred work (conversation summaries)
+    JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "4"))
+    JOBS_QUEUE_MAX: int = int(os.getenv("JOBS_QUEUE_MAX", "10000"))  # beyond this, work runs inline
+    JOBS_MAX_ATTEMPTS: int = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    JOBS_RETRY_BACKOFF_MS: float = float(os.getenv("JOBS_RETRY_BACKOFF_MS", "500"))  # doubled per attempt
+    JOBS_DRAIN_TIMEOUT: float = float(os.getenv("JOBS_DRAIN_TIMEOUT", "10"))  # seconds on shutdown
+    JOBS_PERSISTENT: bool = os.getenv("JOBS_PERSISTENT", "false").lower() == "true"  # queue in MongoDB, survives restarts
+    JOBS_POLL_INTERVAL_MS: float = float(os.getenv("JOBS_POLL_INTERVAL_MS", "1000"))  # persistent queue only
+    JOBS_LEASE_SECONDS: float = float(os.getenv("JOBS_LEASE_SECONDS", "60"))  # renewed while a job runs; reclaimed if its worker dies
+    
+    # Chat history
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))
+    
+    # Write-behind batching of chat log inserts (opt-in)
+    CHAT_LOG_WRITE_BEHIND: bool = os.getenv("CHAT_LOG_WRITE_BEHIND", "false").lower() == "true"
+    CHAT_LOG_BATCH_SIZE: int = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+    CHAT_LOG_FLUSH_INTERVAL_MS: float = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL_MS", "50"))
+    CHAT_LOG_QUEUE_MAX: int = int(os.getenv("CHAT_LOG_QUEUE_MAX", "10000"))  # enqueue waits when full
+    CHAT_LOG_FLUSH_RETRIES: int = int(os.getenv("CHAT_LOG_FLUSH_RETRIES", "3"))  # then one insert per document
+    CHAT_LOG_RETRY_BACKOFF_MS: float = float(os.getenv("CHAT_LOG_RETRY_BACKOFF_MS", "200"))  # doubled per retry
+    
+    # Chat pipeline
+    # "sequential": classify mood, then generate the reply (two LLM calls)
+    # "combined": one structured LLM call returns mood + reply, log write is off the response path
+    CHAT_PIPELINE_MODE: str = os.getenv("CHAT_PIPELINE_MODE", "sequential")
 
 settings = Settings()
\ No newline at end of file
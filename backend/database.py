@@ -1,22 +1,218 @@
+import asyncio
+import threading
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReadPreference
+from pymongo.errors import OperationFailure
+from pymongo.monitoring import ConnectionPoolListener
 from config import settings
 
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    analytics_db = None
 
 db = Database()
 
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primarypreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondarypreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+class PoolMetrics(ConnectionPoolListener):
+    """
+    Connection pool counters, summed over all servers. pymongo calls
+    these from its own threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "open": 0, "checked_out": 0, "waiting": 0,
+            "created": 0, "closed": 0, "checkout_failures": 0, "pool_clears": 0
+        }
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.counters[name] += delta
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(pool_clears=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add(open=1, created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(open=-1, closed=1)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["max_pool_size"] = settings.MONGO_MAX_POOL_SIZE
+        counters["utilization"] = round(counters["checked_out"] / max(settings.MONGO_MAX_POOL_SIZE, 1), 3)
+        return counters
+
+pool_metrics = PoolMetrics()
+
+# Versioned index migrations - append new versions, never edit applied ones.
+# Each index is (collection, keys, options); "drop" lists (collection, index name).
+INDEX_MIGRATIONS = [
+    {
+        "version": 1,
+        "description": "users.email, chat_logs by user/time, mood_daily, cache TTL",
+        "indexes": [
+            ("users", [("email", ASCENDING)], {"unique": True, "name": "email_unique"}),
+            ("chat_logs", [("user_id", ASCENDING), ("timestamp", DESCENDING)], {"name": "user_timestamp"}),
+            ("mood_daily", [("user_id", ASCENDING), ("date", ASCENDING)], {"unique": True, "name": "user_date_unique"}),
+            ("classification_cache", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0, "name": "expires_at_ttl"}),
+        ]
+    },
+    {
+        "version": 2,
+        "description": "chat_logs keyset pagination on (user_id, timestamp, _id)",
+        "indexes": [
+            ("chat_logs", [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "user_timestamp_id"}),
+        ],
+        # Superseded by user_timestamp_id (same prefix)
+        "drop": [("chat_logs", "user_timestamp")]
+    },
+    {
+        "version": 3,
+        "description": "persistent job queue claims, failed jobs kept for 7 days",
+        "indexes": [
+            ("jobs", [("status", ASCENDING), ("priority", ASCENDING), ("available_at", ASCENDING)], {"name": "status_priority_available"}),
+            ("jobs", [("failed_at", ASCENDING)], {"expireAfterSeconds": 7 * 86400, "name": "failed_at_ttl"}),
+        ]
+    },
+]
+
+def client_options() -> dict:
+    """AsyncIOMotorClient keyword arguments built from settings"""
+    write_concern = settings.MONGO_WRITE_CONCERN
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "w": int(write_concern) if write_concern.isdigit() else write_concern,
+        "event_listeners": [pool_metrics],
+    }
+    if settings.MONGO_COMPRESSORS:
+        # pymongo warns about and skips compressors whose module is missing
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
+def analytics_read_preference():
+    name = settings.MONGO_ANALYTICS_READ_PREFERENCE.lower()
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown MONGO_ANALYTICS_READ_PREFERENCE: {settings.MONGO_ANALYTICS_READ_PREFERENCE}")
+    return READ_PREFERENCES[name]
+
+def analytics_reads_primary() -> bool:
+    """False when analytics may read a lagging secondary"""
+    return analytics_read_preference() == ReadPreference.PRIMARY
+
 async def connect_to_mongo():
     """Connect to MongoDB"""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db.client = AsyncIOMotorClient(settings.MONGODB_URL, **client_options())
     db.db = db.client[settings.DATABASE_NAME]
+    db.analytics_db = db.client.get_database(settings.DATABASE_NAME, read_preference=analytics_read_preference())
     print("✅ Connected to MongoDB")
 
+async def warm_up_pool(connections: int = None):
+    """
+    Open connections before the first request arrives: concurrent pings
+    each check out their own connection. minPoolSize only refills the
+    pool in the background, so a cold worker would otherwise pay the
+    TCP/TLS/auth handshakes on its first requests.
+    """
+    if connections is None:
+        connections = settings.MONGO_WARMUP_CONNECTIONS
+    connections = min(connections, settings.MONGO_MAX_POOL_SIZE)
+    if connections <= 0:
+        return
+    
+    results = await asyncio.gather(
+        *(db.client.admin.command("ping") for _ in range(connections)),
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"MongoDB warm-up: {len(failures)} of {connections} pings failed: {failures[0]}")
+    else:
+        print(f"✅ MongoDB pool warmed up ({pool_metrics.stats()['open']} connections open)")
+
+async def ensure_indexes():
+    """
+    Apply index migrations newer than the recorded version.
+    create_index is idempotent, so concurrent workers are safe.
+    """
+    state = await db.db.schema_migrations.find_one({"_id": "indexes"}) or {}
+    current = state.get("version", 0)
+    
+    for migration in INDEX_MIGRATIONS:
+        if migration["version"] <= current:
+            continue
+        try:
+            for collection, keys, options in migration["indexes"]:
+                await db.db[collection].create_index(keys, **options)
+            for collection, name in migration.get("drop", []):
+                try:
+                    await db.db[collection].drop_index(name)
+                except OperationFailure as e:
+                    if e.code != 27:  # IndexNotFound
+                        raise
+        except Exception as e:
+            # Leave the version unchanged so the next startup retries
+            print(f"Index migration v{migration['version']} failed: {e}")
+            return
+        
+        await db.db.schema_migrations.update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": migration["version"], "description": migration["description"]}},
+            upsert=True
+        )
+        current = migration["version"]
+        print(f"✅ Applied index migration v{current}: {migration['description']}")
+
 async def close_mongo_connection():
     """Close MongoDB connection"""
     db.client.close()
     print("❌ Disconnected from MongoDB")
 
 def get_database():
-    return db.db
\ No newline at end of file
+    return db.db
+
+def get_analytics_database():
+    """Same database, read with MONGO_ANALYTICS_READ_PREFERENCE (e.g. from secondaries)"""
+    return db.analytics_db
@@ -1,16 +1,42 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from database import connect_to_mongo, close_mongo_connection
+from config import settings
+from database import (
+    connect_to_mongo, close_mongo_connection, ensure_indexes, get_database,
+    warm_up_pool, pool_metrics
+)
 from routes import auth, chat, analytics
+from services.chat_pipeline import drain_pending_writes
+from services.chat_log_writer import chat_log_writer
+from services.job_runner import job_runner
+from services import password_hasher, llm_client
+from services.shared_store import close_redis
+from services import metrics
+from services.llm_parsing import parse_stats
+from services.mood_classifier import classification_cache_stats, get_batcher
+from services.response_cache import response_cache_stats
+from services.conversation_context import context_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    await warm_up_pool()
+    await ensure_indexes()
+    job_runner.start(get_database())
+    if settings.CHAT_LOG_WRITE_BEHIND:
+        chat_log_writer.start(get_database())
     yield
-    # Shutdown
+    # Shutdown - flush buffered chat logs, then drain the jobs they queued,
+    # before closing MongoDB
+    await chat_log_writer.stop()
+    await drain_pending_writes()
+    await job_runner.stop()
+    password_hasher.shutdown()
+    await close_redis()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -20,6 +46,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Existing component stats, exported as gauges on /metrics
+metrics.register_stats("llm", llm_client.stats)
+metrics.register_stats("llm_parse", lambda: {key.split("@")[0]: counts for key, counts in parse_stats().items()})
+metrics.register_stats("classify_cache", classification_cache_stats)
+metrics.register_stats("response_cache", response_cache_stats)
+metrics.register_stats("token_cache", auth.token_cache_stats)
+metrics.register_stats("auth_rate_limit", lambda: {"ip": auth.ip_limiter.stats(), "email": auth.email_limiter.stats()})
+metrics.register_stats("mongo_pool", pool_metrics.stats)
+metrics.register_stats("conversation_context", context_stats)
+metrics.register_stats("jobs", job_runner.stats)
+if settings.CLASSIFY_BATCH_ENABLED:
+    metrics.register_stats("classify_batcher", lambda: get_batcher().stats())
+if settings.CHAT_LOG_WRITE_BEHIND:
+    metrics.register_stats("chat_log_writer", chat_log_writer.stats)
+
 # CORS - Allow frontend to connect
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +70,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it is outermost and times every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(chat.router)
@@ -44,6 +88,18 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    circuit = llm_client.breaker.stats()
+    return {
+        # Still serving (static fallbacks) while the LLM circuit is open
+        "status": "healthy" if circuit["state"] == "closed" else "degraded",
+        "llm": {"circuit": circuit},
+        "mongo": {"pool": pool_metrics.stats()}
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-# Run with: uvicorn main:app --reload --port 8000
\ No newline at end of file
+# Development: uvicorn main:app --reload --port 8000
+# Production (multiple workers): python serve.py
\ No newline at end of file
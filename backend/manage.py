@@ -0,0 +1,215 @@
+"""
+MindScope AI maintenance commands.
+
+Run from backend/:
+    python manage.py train-classifier
+    python manage.py backfill-rollups --cutoff 2024-05-01T12:00:00   # after deploying
+    python manage.py explain-indexes
+    python manage.py export-chats --user-id <id> --format csv --out chats.csv
+    python manage.py trend-report --window 90
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_database
+
+def read_jsonl(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def train_classifier(args):
+    from services.local_classifier import LocalMoodClassifier, load_labeled_messages
+    
+    if args.from_file:
+        samples = [(row["message"], row["mood"]) for row in read_jsonl(args.from_file)]
+    else:
+        await connect_to_mongo()
+        try:
+            samples = await load_labeled_messages(get_database(), args.limit, args.min_confidence)
+        finally:
+            await close_mongo_connection()
+    
+    if not samples:
+        print("No labelled chat logs found - nothing to train on")
+        return
+    
+    model = LocalMoodClassifier.train(samples)
+    model.save(args.out)
+    print(f"✅ Trained local mood classifier on {len(samples)} messages -> {args.out}")
+
+async def backfill_rollups(args):
+    from datetime import datetime
+    from bson import ObjectId
+    from services.mood_rollups import backfill_rollups as rebuild
+    
+    await connect_to_mongo()
+    try:
+        user_id = ObjectId(args.user_id) if args.user_id else None
+        cutoff = datetime.fromisoformat(args.cutoff) if args.cutoff else None
+        written = await rebuild(get_database(), user_id, cutoff)
+    finally:
+        await close_mongo_connection()
+    print(f"✅ Rebuilt {written} mood_daily rollup documents")
+
+def _find_key(document, key):
+    """Depth-first search for the first value stored under key"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        document = list(document.values())
+    if isinstance(document, list):
+        for item in document:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten a winning plan into (stage, index name) pairs"""
+    stages = [(plan.get("stage"), plan.get("indexName"))]
+    children = plan.get("inputStages", [])
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            children = children + [plan[key]]
+    for child in children:
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def explain_indexes(args):
+    from bson import ObjectId
+    from datetime import datetime, timedelta
+    from database import ensure_indexes
+    
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        if args.apply:
+            await ensure_indexes()
+        
+        state = await db.schema_migrations.find_one({"_id": "indexes"}) or {}
+        print(f"Index version: {state.get('version', 0)}\n")
+        
+        user_id = ObjectId()
+        since = datetime.utcnow() - timedelta(days=30)
+        queries = [
+            ("auth login/register: users by email",
+             db.users.find({"email": "someone@example.com"})),
+            ("chat history: chat_logs by user, newest first",
+             db.chat_logs.find({"user_id": user_id}).sort([("timestamp", -1), ("_id", -1)]).limit(21)),
+            ("analytics (raw): chat_logs by user and time range",
+             db.chat_logs.find({"user_id": user_id, "timestamp": {"$gte": since}}, {"mood": 1, "timestamp": 1})),
+            ("analytics (rollups): mood_daily by user and date range",
+             db.mood_daily.find({"user_id": user_id, "date": {"$gte": since.strftime("%Y-%m-%d")}})),
+        ]
+        
+        uncovered = 0
+        for name, cursor in queries:
+            plan = _find_key(await cursor.explain(), "winningPlan") or {}
+            stages = _plan_stages(plan)
+            indexes = sorted({index for _, index in stages if index})
+            covered = not any(stage == "COLLSCAN" for stage, _ in stages) and bool(indexes)
+            uncovered += not covered
+            mark = "✅" if covered else "❌"
+            detail = ", ".join(indexes) if indexes else "COLLSCAN"
+            print(f"{mark} {name}\n     plan: {' <- '.join(stage for stage, _ in stages if stage)} ({detail})")
+        
+        print(f"\n{len(queries) - uncovered}/{len(queries)} queries use an index")
+    finally:
+        await close_mongo_connection()
+
+async def export_chats(args):
+    from services.chat_export import (
+        ExportError, parse_fields, parse_moods, parse_datetime, build_export_query, export_stream
+    )
+    
+    try:
+        query = build_export_query(
+            args.user_id or None,
+            parse_datetime(args.start),
+            parse_datetime(args.end),
+            parse_moods(args.moods)
+        )
+        fields = parse_fields(args.fields)
+        # Keep stdout clean for `--out -`
+        with contextlib.redirect_stdout(sys.stderr):
+            await connect_to_mongo()
+        body = export_stream(get_database(), query, fields, args.format, args.batch_size)
+    except ExportError as e:
+        raise SystemExit(str(e))
+    
+    written = 0
+    out = open(args.out, "wb") if args.out != "-" else sys.stdout.buffer
+    try:
+        async for chunk in body:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        with contextlib.redirect_stdout(sys.stderr):
+            await close_mongo_connection()
+    print(f"✅ Exported {written / 1024:.1f} KiB of {args.format} to {args.out}", file=sys.stderr)
+
+async def trend_report(args):
+    from bson import ObjectId
+    from services.mood_trends import load_daily_series, trend_metrics, cohort_stats
+    
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        user_ids = args.user_id or [str(user_id) for user_id in await db.users.distinct("_id")]
+        series = await load_daily_series(db, [ObjectId(user_id) for user_id in user_ids], args.window)
+    finally:
+        await close_mongo_connection()
+    
+    report = cohort_stats(series, trend_metrics(series, args.smooth))
+    report.update({"window_days": args.window, "start": series.dates[0], "end": series.dates[-1]})
+    print(json.dumps(report, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="MindScope AI maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    train = commands.add_parser("train-classifier", help="Train the local mood classifier from chat_logs labels")
+    train.add_argument("--out", default=settings.LOCAL_CLASSIFIER_PATH)
+    train.add_argument("--limit", type=int, default=0, help="most recent N logs (0 = all)")
+    train.add_argument("--min-confidence", type=float, default=0.6)
+    train.add_argument("--from-file", help="JSONL of {message, mood} instead of MongoDB")
+    train.set_defaults(handler=train_classifier)
+    
+    backfill = commands.add_parser("backfill-rollups", help="Rebuild mood_daily rollups from chat_logs (run after deploying; safe to re-run)")
+    backfill.add_argument("--user-id", help="only this user (default: everyone)")
+    backfill.add_argument("--cutoff", help="UTC time live rollup writes started, e.g. the deploy "
+                                           "(default: midnight today, rebuilding finished days only)")
+    backfill.set_defaults(handler=backfill_rollups)
+    
+    explain = commands.add_parser("explain-indexes", help="Report which hot queries are covered by an index")
+    explain.add_argument("--apply", action="store_true", help="apply pending index migrations first")
+    explain.set_defaults(handler=explain_indexes)
+    
+    export = commands.add_parser("export-chats", help="Stream chat logs to NDJSON, CSV, Arrow or Parquet")
+    export.add_argument("--user-id", action="append", help="repeat for a cohort (default: every user)")
+    export.add_argument("--start", help="ISO date/time, inclusive")
+    export.add_argument("--end", help="ISO date/time, exclusive")
+    export.add_argument("--moods", help="comma-separated moods to keep")
+    export.add_argument("--fields", help="comma-separated fields (default: timestamp,mood,confidence)")
+    export.add_argument("--format", default="ndjson", choices=["ndjson", "csv", "arrow", "parquet"])
+    export.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    export.add_argument("--out", default="-", help="file path, or - for stdout")
+    export.set_defaults(handler=export_chats)
+    
+    trend = commands.add_parser("trend-report", help="Cohort mood trend statistics (JSON)")
+    trend.add_argument("--user-id", action="append", help="repeat for a cohort (default: every user)")
+    trend.add_argument("--window", type=int, default=30, help="days")
+    trend.add_argument("--smooth", type=int, default=7, help="rolling average days")
+    trend.set_defaults(handler=trend_report)
+    
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
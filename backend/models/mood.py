@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List
 from datetime import datetime
+import math
 
 # Fixed mood list - NEVER change this
 ALLOWED_MOODS = [
@@ -130,6 +131,21 @@ MOOD_SUGGESTIONS = {
     }
 }
 
+# Default quotes when the mood is decided without the LLM
+MOOD_QUOTES = {
+    "Happy": "Happiness grows when it is shared.",
+    "Motivated": "Small steps every day add up to big results.",
+    "Neutral": "Take a moment to breathe.",
+    "Sad": "It's okay not to be okay. This feeling will pass.",
+    "Stressed": "You don't have to do everything at once.",
+    "Anxious": "Breathe in calm, breathe out worry.",
+    "Angry": "Pause, breathe, and let the storm settle.",
+    "Fear": "Courage is not the absence of fear, but moving through it.",
+    "Confused": "Clarity comes one question at a time.",
+    "Burnout": "Rest is not a reward, it is a need.",
+    "Critical": "You matter, and you don't have to face this alone."
+}
+
 class MoodAnalytics(BaseModel):
     date: str
     mood: str
@@ -139,4 +155,45 @@ class MoodAnalytics(BaseModel):
 class WeeklyTrend(BaseModel):
     data: List[MoodAnalytics]
     average_score: float
-    dominant_mood: str
\ No newline at end of file
+    dominant_mood: str
+
+# Schemas for structured LLM answers
+class MoodClassification(BaseModel):
+    mood: str
+    confidence: float = 0.7
+    quote: str = "Every moment is a fresh beginning."
+
+    @field_validator("mood", mode="before")
+    @classmethod
+    def validate_mood(cls, value):
+        label = str(value).strip().capitalize()
+        if label not in ALLOWED_MOODS:
+            raise ValueError(f"mood must be one of ALLOWED_MOODS, got {value!r}")
+        return label
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def validate_confidence(cls, value):
+        # Only ValueError becomes a ValidationError; a TypeError (None, a
+        # list...) would escape the parser and fail a whole batch
+        scale = 1.0
+        if isinstance(value, str) and value.strip().endswith("%"):
+            value, scale = value.strip().rstrip("%"), 100.0
+        try:
+            number = float(value) / scale
+        except (TypeError, ValueError):
+            raise ValueError(f"confidence must be a number, got {value!r}")
+        if math.isnan(number):
+            raise ValueError("confidence must be a number, got NaN")
+        return min(max(number, 0.0), 1.0)
+
+    @field_validator("quote", mode="before")
+    @classmethod
+    def validate_quote(cls, value):
+        return str(value).strip() or "Every moment is a fresh beginning."
+
+class BatchMoodItem(MoodClassification):
+    id: int
+
+class CombinedMoodReply(MoodClassification):
+    reply: str = ""
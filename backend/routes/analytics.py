@@ -1,40 +1,83 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
+from typing import Optional
 from bson import ObjectId
-from collections import Counter
+from collections import Counter, defaultdict
 
-from database import get_database
+from config import settings
+from database import get_analytics_database, analytics_reads_primary
 from models.mood import MOOD_SCORES
 from routes.auth import get_current_user
+from services.mood_rollups import load_daily_counts
+from services.mood_trends import load_daily_series, trend_metrics, user_trend
+from services.response_cache import cached_response
+from services.metrics import stage_timer
+from services.chat_export import (
+    EXPORT_FORMATS, ExportError, parse_fields, parse_moods, parse_datetime, build_export_query, export_stream
+)
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
-@router.get("/weekly-trend", response_model=dict)
-async def get_weekly_trend(user_id: str = Depends(get_current_user)):
-    """Get mood trend for the past 7 days"""
-    db = get_database()
+def _chat_log_match(user_id: str, start_date: datetime, end_date: datetime = None) -> dict:
+    timestamp_range = {"$gte": start_date}
+    if end_date is not None:
+        timestamp_range["$lte"] = end_date
+    return {"user_id": ObjectId(user_id), "timestamp": timestamp_range}
+
+async def get_daily_mood_counts(db, user_id: str, start_date: datetime, end_date: datetime = None) -> dict:
+    """
+    Per-day mood Counters keyed by "YYYY-MM-DD", read from the
+    mood_daily rollups (or aggregated server-side from chat_logs)
+    """
+    if settings.ANALYTICS_USE_ROLLUPS:
+        return await load_daily_counts(db, ObjectId(user_id), start_date, end_date)
     
-    # Calculate date range
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=7)
+    pipeline = [
+        {"$match": _chat_log_match(user_id, start_date, end_date)},
+        {"$project": {"_id": 0, "mood": 1, "timestamp": 1}},
+        {"$group": {
+            "_id": {
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "mood": "$mood"
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
     
-    # Fetch mood logs
-    cursor = db.chat_logs.find({
-        "user_id": ObjectId(user_id),
-        "timestamp": {"$gte": start_date, "$lte": end_date}
-    }).sort("timestamp", 1)
+    daily_counts = defaultdict(Counter)
+    async for row in db.chat_logs.aggregate(pipeline):
+        daily_counts[row["_id"]["date"]][row["_id"]["mood"]] = row["count"]
+    return daily_counts
+
+async def get_mood_totals(db, user_id: str, start_date: datetime) -> Counter:
+    """Mood counts since start_date (rollups, or one $group per mood)"""
+    if settings.ANALYTICS_USE_ROLLUPS:
+        mood_counts = Counter()
+        for counts in (await load_daily_counts(db, ObjectId(user_id), start_date)).values():
+            mood_counts.update(counts)
+        return mood_counts
     
-    # Process data by day
-    daily_data = {}
-    async for log in cursor:
-        date_key = log["timestamp"].strftime("%Y-%m-%d")
-        if date_key not in daily_data:
-            daily_data[date_key] = []
-        daily_data[date_key].append(log["mood"])
+    pipeline = [
+        {"$match": _chat_log_match(user_id, start_date)},
+        {"$project": {"_id": 0, "mood": 1}},
+        {"$group": {"_id": "$mood", "count": {"$sum": 1}}}
+    ]
+    
+    return Counter({row["_id"]: row["count"] async for row in db.chat_logs.aggregate(pipeline)})
+
+async def build_weekly_trend(user_id: str, end_date: datetime) -> dict:
+    """Mood trend for the 7 days before end_date"""
+    db = get_analytics_database()
+    start_date = end_date - timedelta(days=7)
+    
+    # Fetch mood counts by day
+    with stage_timer("db_analytics_daily"):
+        daily_data = await get_daily_mood_counts(db, user_id, start_date, end_date)
     
     # Build trend data
     trend = []
-    all_moods = []
+    all_moods = Counter()
     total_score = 0
     count = 0
     
@@ -42,12 +85,12 @@ async def get_weekly_trend(user_id: str = Depends(get_current_user)):
         date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
         day_name = (start_date + timedelta(days=i)).strftime("%a")
         
-        if date in daily_data:
+        if daily_data.get(date):
             moods = daily_data[date]
-            all_moods.extend(moods)
+            all_moods.update(moods)
             
             # Get dominant mood for the day
-            dominant = Counter(moods).most_common(1)[0][0]
+            dominant = moods.most_common(1)[0][0]
             score = MOOD_SCORES.get(dominant, 0)
             total_score += score
             count += 1
@@ -57,7 +100,7 @@ async def get_weekly_trend(user_id: str = Depends(get_current_user)):
                 "day": day_name,
                 "mood": dominant,
                 "score": score,
-                "entries": len(moods)
+                "entries": sum(moods.values())
             })
         else:
             trend.append({
@@ -70,7 +113,7 @@ async def get_weekly_trend(user_id: str = Depends(get_current_user)):
     
     # Calculate overall stats
     avg_score = total_score / count if count > 0 else 0
-    dominant_mood = Counter(all_moods).most_common(1)[0][0] if all_moods else "Neutral"
+    dominant_mood = all_moods.most_common(1)[0][0] if all_moods else "Neutral"
     
     return {
         "success": True,
@@ -79,29 +122,25 @@ async def get_weekly_trend(user_id: str = Depends(get_current_user)):
             "summary": {
                 "average_score": round(avg_score, 2),
                 "dominant_mood": dominant_mood,
-                "total_entries": len(all_moods)
+                "total_entries": sum(all_moods.values())
             }
         }
     }
 
-@router.get("/mood-distribution", response_model=dict)
-async def get_mood_distribution(
-    days: int = 30,
-    user_id: str = Depends(get_current_user)
-):
-    """Get mood distribution for specified days"""
-    db = get_database()
-    
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
-    cursor = db.chat_logs.find({
-        "user_id": ObjectId(user_id),
-        "timestamp": {"$gte": start_date}
-    })
+@router.get("/weekly-trend", response_model=dict)
+async def get_weekly_trend(request: Request, user_id: str = Depends(get_current_user)):
+    """Get mood trend for the past 7 days"""
+    end_date = datetime.utcnow()
+    view = f"weekly-trend:{end_date:%Y-%m-%d}"
+    return await cached_response(request, user_id, view, lambda: build_weekly_trend(user_id, end_date),
+                                 cache=analytics_reads_primary())
+
+async def build_mood_distribution(user_id: str, days: int, start_date: datetime) -> dict:
+    """Mood distribution since start_date"""
+    db = get_analytics_database()
     
-    mood_counts = Counter()
-    async for log in cursor:
-        mood_counts[log["mood"]] += 1
+    with stage_timer("db_analytics_totals"):
+        mood_counts = await get_mood_totals(db, user_id, start_date)
     
     total = sum(mood_counts.values())
     
@@ -118,4 +157,72 @@ async def get_mood_distribution(
         "period_days": days,
         "total_entries": total,
         "distribution": distribution
-    }
\ No newline at end of file
+    }
+
+@router.get("/mood-distribution", response_model=dict)
+async def get_mood_distribution(
+    request: Request,
+    days: int = Query(30, ge=1, le=3660),
+    user_id: str = Depends(get_current_user)
+):
+    """Get mood distribution for specified days"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    view = f"mood-distribution:{days}:{start_date:%Y-%m-%d}"
+    return await cached_response(request, user_id, view, lambda: build_mood_distribution(user_id, days, start_date),
+                                 cache=analytics_reads_primary())
+
+async def build_trend(user_id: str, window: int, smooth: int, end_date: datetime) -> dict:
+    """Daily series and trend summary for the `window` days up to end_date"""
+    with stage_timer("db_analytics_series"):
+        series = await load_daily_series(get_analytics_database(), [user_id], window, end_date)
+    
+    return {
+        "success": True,
+        "window_days": window,
+        "smooth_days": smooth,
+        "data": user_trend(series, trend_metrics(series, smooth))
+    }
+
+@router.get("/trend", response_model=dict)
+async def get_trend(
+    request: Request,
+    window: int = Query(30, ge=7, le=settings.TREND_MAX_WINDOW),
+    smooth: int = Query(7, ge=1, le=30),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Daily mood scores over the last `window` days with a `smooth`-day
+    rolling average, volatility, slope, week-over-week change and streaks
+    """
+    end_date = datetime.utcnow()
+    view = f"trend:{window}:{smooth}:{end_date:%Y-%m-%d}"
+    return await cached_response(request, user_id, view, lambda: build_trend(user_id, window, smooth, end_date),
+                                 cache=analytics_reads_primary())
+
+@router.get("/export")
+async def export_chat_logs(
+    format: str = "ndjson",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    moods: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Stream the user's chat logs as NDJSON, CSV, Arrow or Parquet.
+    `start`/`end` bound the time range, `moods` and `fields` are
+    comma-separated filters and projections.
+    """
+    try:
+        selected_fields = parse_fields(fields)
+        query = build_export_query([user_id], parse_datetime(start), parse_datetime(end), parse_moods(moods))
+        body = export_stream(get_analytics_database(), query, selected_fields, format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="mindscope-export.{extension}"'}
+    )
@@ -1,49 +1,137 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from jose import jwt, JWTError
+from bson import ObjectId
+import hashlib
+import time
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pymongo.errors import DuplicateKeyError
 
 from database import get_database
 from models.user import UserCreate, UserLogin, UserResponse
 from config import settings
+from services.password_hasher import hash_password, verify_password
+from services.rate_limiter import RateLimiter
+from services.cache import TTLCache
+from services.shared_store import create_store
+from services.metrics import stage_timer
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+ip_limiter = RateLimiter(settings.AUTH_RATE_LIMIT_PER_IP, settings.AUTH_RATE_WINDOW, "ratelimit:ip")
+email_limiter = RateLimiter(settings.AUTH_RATE_LIMIT_PER_EMAIL, settings.AUTH_RATE_WINDOW, "ratelimit:email")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def check_rate_limit(request: Request, email: str = None):
+    """Reject login storms before they reach bcrypt"""
+    retry_after = await ip_limiter.hit(request.client.host if request.client else "unknown")
+    if not retry_after and email:
+        retry_after = await email_limiter.hit(email.lower())
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
+
+# Verified token payloads, each cached no longer than the token's own exp.
+# Per process: it only saves signature checks, revocations are shared.
+token_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+# Revocation hooks: single tokens until they expire, and users whose
+# tokens issued before the revocation time are rejected
+_revoked_tokens = create_store("revoked_tokens", settings.TOKEN_CACHE_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_revoked_users = create_store("revoked_users", settings.TOKEN_CACHE_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+def _token_id(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+async def revoke_token(token: str):
+    """Reject this token from now on (e.g. logout)"""
+    token_cache.delete(token)
+    await _revoked_tokens.set(_token_id(token), True)
+
+async def revoke_user(user_id: str):
+    """
+    Reject every token issued to the user before this second (e.g. password
+    change). iat has whole-second precision, so a token issued later in
+    the same second, such as the re-login that follows, stays valid.
+    """
+    await _revoked_users.set(user_id, int(time.time()))
+
+def token_cache_stats() -> dict:
+    return {
+        **token_cache.stats(),
+        "revoked_tokens": _revoked_tokens.stats(),
+        "revoked_users": _revoked_users.stats()
+    }
+
+async def decode_token(token: str) -> dict:
+    """Verified payload for the token, from the cache when possible"""
+    if await _revoked_tokens.get(_token_id(token)):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            token_cache.set(token, payload, ttl=min(remaining, settings.TOKEN_CACHE_TTL))
+    elif payload.get("exp", 0) <= time.time():
+        token_cache.delete(token)
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    revoked_at = await _revoked_users.get(payload.get("user_id"))
+    if revoked_at is not None and payload.get("iat", 0) < revoked_at:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    
+    return payload
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token and return current user"""
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except JWTError:
+    with stage_timer("auth_token"):
+        payload = await decode_token(credentials.credentials)
+    user_id = payload.get("user_id")
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+async def get_current_user_doc(request: Request, user_id: str = Depends(get_current_user)) -> dict:
+    """
+    The current user's document, loaded at most once per request and
+    shared through request.state by every dependency that needs it
+    """
+    user = getattr(request.state, "user", None)
+    if user is None:
+        db = get_database()
+        with stage_timer("db_users_find"):
+            user = await db.users.find_one({"_id": ObjectId(user_id)}, {"hashed_password": 0})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        request.state.user = user
+    return user
 
 @router.post("/register", response_model=dict)
-async def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
     """Register a new user"""
+    await check_rate_limit(request)
     db = get_database()
     
     # Check if email already exists
-    existing_user = await db.users.find_one({"email": user.email})
+    with stage_timer("db_users_find"):
+        existing_user = await db.users.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -51,14 +139,24 @@ async def register(user: UserCreate):
         )
     
     # Create new user
+    with stage_timer("auth_password_hash"):
+        hashed_password = await hash_password(user.password)
     new_user = {
         "name": user.name,
         "email": user.email,
-        "hashed_password": hash_password(user.password),
+        "hashed_password": hashed_password,
         "created_at": datetime.utcnow()
     }
     
-    result = await db.users.insert_one(new_user)
+    try:
+        with stage_timer("db_users_insert"):
+            result = await db.users.insert_one(new_user)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration (unique email index)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Create token
     access_token = create_access_token({"user_id": str(result.inserted_id)})
@@ -75,12 +173,14 @@ async def register(user: UserCreate):
     }
 
 @router.post("/login", response_model=dict)
-async def login(user: UserLogin):
+async def login(user: UserLogin, request: Request):
     """Login user and return token"""
+    await check_rate_limit(request, user.email)
     db = get_database()
     
     # Find user
-    db_user = await db.users.find_one({"email": user.email})
+    with stage_timer("db_users_find"):
+        db_user = await db.users.find_one({"email": user.email})
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -88,12 +188,19 @@ async def login(user: UserLogin):
         )
     
     # Verify password
-    if not verify_password(user.password, db_user["hashed_password"]):
+    with stage_timer("auth_password_verify"):
+        valid, new_hash = await verify_password(user.password, db_user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    # Upgrade hashes made with an old cost factor
+    if new_hash:
+        with stage_timer("db_users_update"):
+            await db.users.update_one({"_id": db_user["_id"]}, {"$set": {"hashed_password": new_hash}})
+    
     # Create token
     access_token = create_access_token({"user_id": str(db_user["_id"])})
     
@@ -108,16 +215,16 @@ async def login(user: UserLogin):
         }
     }
 
+@router.post("/logout", response_model=dict)
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the current token"""
+    await decode_token(credentials.credentials)
+    await revoke_token(credentials.credentials)
+    return {"message": "Logged out"}
+
 @router.get("/me", response_model=dict)
-async def get_me(user_id: str = Depends(get_current_user)):
+async def get_me(user: dict = Depends(get_current_user_doc)):
     """Get current user info"""
-    db = get_database()
-    from bson import ObjectId
-    
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     return {
         "id": str(user["_id"]),
         "name": user["name"],
@@ -1,15 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from datetime import datetime
 from bson import ObjectId
+from typing import Optional
+import asyncio
+import base64
+import orjson
 
+from config import settings
 from database import get_database
 from models.chat import ChatMessage, ChatResponse
+from services.chat_pipeline import process_message, save_chat_log
 from services.mood_classifier import classify_mood
-from services.ai_responder import generate_response
+from services.ai_responder import stream_response
+from services.conversation_context import prompt_context
+from services.llm_client import LLMOverloadedError
+from services.metrics import stage_timer, MOOD_RESULTS
+from services.response_cache import cached_response
 from routes.auth import get_current_user
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+def build_chat_log(user_id: str, message: str, mood_result: dict, ai_response: str) -> dict:
+    return {
+        "user_id": ObjectId(user_id),
+        "message": message,
+        "mood": mood_result["mood"],
+        "confidence": mood_result["confidence"],
+        "mood_source": mood_result["source"],
+        "ai_reply": ai_response,
+        "timestamp": datetime.utcnow()
+    }
+
+def build_mood_payload(mood_result: dict) -> dict:
+    """
+    Mood, UI theme and suggestions as returned to the frontend. The
+    theme and suggestions are pre-serialized fragments: encode with orjson.
+    """
+    presentation = mood_result["presentation"]
+    return {
+        "mood": {
+            "detected": mood_result["mood"],
+            "confidence": mood_result["confidence"],
+            "emoji": presentation.emoji,
+            "quote": mood_result["quote"]
+        },
+        "ui": presentation.ui_json,
+        "suggestions": presentation.suggestions_json
+    }
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
 @router.post("/send", response_model=dict)
 async def send_message(
     chat: ChatMessage,
@@ -18,83 +60,175 @@ async def send_message(
     """
     Process user message:
     1. Detect mood
-    2. Generate AI response
-    3. Save to database
+    2. Generate AI response (one combined call in pipelined mode)
+    3. Save to database (off the response path in pipelined mode)
     4. Return full response with UI updates
     """
     db = get_database()
     
     try:
-        # Step 1: Classify mood
-        mood_result = await classify_mood(chat.message)
-        
-        # Step 2: Generate AI response
-        ai_response = await generate_response(
-            message=chat.message,
-            mood=mood_result["mood"],
-            confidence=mood_result["confidence"]
-        )
+        # Step 1 & 2: Classify mood and generate AI response
+        mood_result, ai_response = await process_message(chat.message, user_id)
         
         # Step 3: Save chat log
-        chat_log = {
-            "user_id": ObjectId(user_id),
-            "message": chat.message,
-            "mood": mood_result["mood"],
-            "confidence": mood_result["confidence"],
-            "ai_reply": ai_response,
-            "timestamp": datetime.utcnow()
-        }
-        
-        await db.chat_logs.insert_one(chat_log)
+        chat_log = build_chat_log(user_id, chat.message, mood_result, ai_response)
+        await save_chat_log(db, chat_log)
         
-        # Step 4: Return complete response
-        return {
+        # Step 4: Return complete response (encoded directly, no re-validation)
+        return ORJSONResponse({
             "success": True,
             "data": {
                 "user_message": chat.message,
                 "ai_response": ai_response,
-                "mood": {
-                    "detected": mood_result["mood"],
-                    "confidence": mood_result["confidence"],
-                    "emoji": mood_result["emoji"],
-                    "quote": mood_result["quote"]
-                },
-                "ui": {
-                    "theme": mood_result["ui_theme"],
-                    "background_gradient": mood_result["background_gradient"]
-                },
-                "suggestions": mood_result["suggestions"],
+                **build_mood_payload(mood_result),
                 "timestamp": datetime.utcnow().isoformat()
             }
-        }
+        })
         
+    except LLMOverloadedError:
+        raise HTTPException(
+            status_code=429,
+            detail="AI service is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/history", response_model=dict)
-async def get_chat_history(
-    limit: int = 20,
+async def chat_event_stream(db, user_id: str, message: str, mood_result: dict, context: str = ""):
+    """
+    Server-Sent Events for /chat/stream:
+    mood (theme payload first) -> token* -> done
+    """
+    yield sse_event("mood", build_mood_payload(mood_result))
+    
+    chunks = []
+    with stage_timer("reply_stream"):
+        async for chunk in stream_response(
+            message=message,
+            mood=mood_result["mood"],
+            confidence=mood_result["confidence"],
+            context=context
+        ):
+            chunks.append(chunk)
+            yield sse_event("token", {"text": chunk})
+    
+    # Persist once the full reply has been streamed
+    ai_response = "".join(chunks).strip()
+    chat_log = build_chat_log(user_id, message, mood_result, ai_response)
+    try:
+        await save_chat_log(db, chat_log)
+    except Exception as e:
+        print(f"Chat log write error: {e}")
+    
+    yield sse_event("done", {
+        "ai_response": ai_response,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+@router.post("/stream")
+async def stream_message(
+    chat: ChatMessage,
     user_id: str = Depends(get_current_user)
 ):
-    """Get user's chat history"""
+    """
+    Streaming variant of /chat/send using Server-Sent Events.
+    The mood/theme event is sent as soon as the mood is known, then
+    the reply tokens, and the chat log is saved when the stream ends.
+    """
+    db = get_database()
+    
+    try:
+        with stage_timer("classify"):
+            mood_result, context = await asyncio.gather(
+                classify_mood(chat.message),
+                prompt_context(user_id)
+            )
+    except LLMOverloadedError:
+        raise HTTPException(
+            status_code=429,
+            detail="AI service is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    MOOD_RESULTS.labels(mood_result["source"]).inc()
+    
+    return StreamingResponse(
+        chat_event_stream(db, user_id, chat.message, mood_result, context),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def encode_history_cursor(timestamp: datetime, chat_id: ObjectId) -> str:
+    raw = f"{timestamp.isoformat()}|{chat_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, chat_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), ObjectId(chat_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+async def build_chat_history(user_id: str, limit: int, before: Optional[tuple]) -> dict:
+    """One page of chat history, oldest message first"""
     db = get_database()
     
+    query = {"user_id": ObjectId(user_id)}
+    if before:
+        # Keyset pagination on (timestamp, _id)
+        timestamp, chat_id = before
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": chat_id}}
+        ]
+    
+    # Fetch one extra document to know whether an older page exists
     cursor = db.chat_logs.find(
-        {"user_id": ObjectId(user_id)}
-    ).sort("timestamp", -1).limit(limit)
+        query,
+        {"message": 1, "mood": 1, "ai_reply": 1, "timestamp": 1}
+    ).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1)
     
-    chats = []
-    async for chat in cursor:
-        chats.append({
+    with stage_timer("db_chat_history"):
+        docs = await cursor.to_list(length=limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    
+    chats = [
+        {
             "id": str(chat["_id"]),
             "message": chat["message"],
             "mood": chat["mood"],
             "ai_reply": chat["ai_reply"],
             "timestamp": chat["timestamp"].isoformat()
-        })
+        }
+        for chat in reversed(docs)  # Oldest first
+    ]
+    
+    next_cursor = None
+    if has_more:
+        oldest = docs[-1]
+        next_cursor = encode_history_cursor(oldest["timestamp"], oldest["_id"])
     
     return {
         "success": True,
         "count": len(chats),
-        "chats": chats[::-1]  # Reverse to show oldest first
-    }
\ No newline at end of file
+        "chats": chats,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/history", response_model=dict)
+async def get_chat_history(
+    request: Request,
+    limit: int = 20,
+    before: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Get user's chat history, one page at a time (newest page first).
+    Pass the returned next_cursor as `before` to load older messages.
+    """
+    limit = max(1, min(limit, settings.HISTORY_MAX_PAGE_SIZE))
+    position = decode_history_cursor(before) if before else None
+    
+    view = f"history:{limit}:{before or ''}"
+    return await cached_response(request, user_id, view, lambda: build_chat_history(user_id, limit, position))
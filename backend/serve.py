@@ -0,0 +1,46 @@
+"""
+Production entry point: runs WEB_CONCURRENCY uvicorn worker processes.
+
+    python serve.py
+
+Equivalent gunicorn setup (gunicorn is not a dependency):
+
+    gunicorn main:app -k uvicorn.workers.UvicornWorker -w $WEB_CONCURRENCY -b 0.0.0.0:8000
+
+Rate limits and token revocations only hold across workers with
+CACHE_BACKEND=redis; MongoDB pools (MONGO_MAX_POOL_SIZE) and the LLM
+limit (LLM_MAX_CONCURRENCY) are per worker. Without redis the response
+and conversation context caches are turned off for multiple workers: a
+chat log saved by one worker would not reach the other workers' copies.
+Under gunicorn set RESPONSE_CACHE_TTL=0 and CONTEXT_CACHE_TTL=0 yourself
+in that case.
+"""
+import os
+
+import uvicorn
+
+from config import settings
+
+def main():
+    workers = max(settings.WEB_CONCURRENCY, 1)
+    if workers > 1 and settings.CACHE_BACKEND != "redis":
+        print(f"⚠️  {workers} workers with CACHE_BACKEND={settings.CACHE_BACKEND}: "
+              "rate limits, revocations and caches are per worker")
+        # Workers are fresh processes that read their settings from the environment
+        for name in ("RESPONSE_CACHE_TTL", "CONTEXT_CACHE_TTL"):
+            if getattr(settings, name) > 0:
+                os.environ[name] = "0"
+                print(f"⚠️  {name}=0: this cache needs CACHE_BACKEND=redis with more than one worker")
+    print(f"Starting {workers} worker(s) on {settings.HOST}:{settings.PORT} "
+          f"(MongoDB connections up to {workers * settings.MONGO_MAX_POOL_SIZE})")
+    
+    uvicorn.run(
+        "main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        proxy_headers=True
+    )
+
+if __name__ == "__main__":
+    main()
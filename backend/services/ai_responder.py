@@ -1,7 +1,6 @@
-import google.generativeai as genai
-from config import settings
-
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from services import llm_client
+from services.llm_client import LLMOverloadedError
+from services.metrics import REPLY_FALLBACKS
 
 AI_RESPONSE_PROMPT = """
 You are MindScope AI, an empathetic emotional wellbeing companion.
@@ -24,44 +23,81 @@ Special Instructions for Critical mood:
 - Mention that professional help is available
 - Do NOT provide any harmful information
 
+Conversation so far (background only - reply to the latest message):
+{context}
+
 User message:
 "{message}"
 
 Respond naturally:
 """
 
-async def generate_response(message: str, mood: str, confidence: float) -> str:
+NO_CONTEXT = "(this is the start of the conversation)"
+
+# Fallback responses based on mood
+FALLBACK_RESPONSES = {
+    "Happy": "That's wonderful to hear! Keep embracing these positive moments.",
+    "Motivated": "Your energy is inspiring! Channel it towards your goals.",
+    "Neutral": "I'm here whenever you want to talk about anything.",
+    "Sad": "I hear you. It's okay to feel this way. I'm here with you.",
+    "Stressed": "That sounds overwhelming. Let's take this one step at a time.",
+    "Anxious": "I understand that feeling. Try taking a few deep breaths with me.",
+    "Angry": "Your feelings are valid. Let's work through this together.",
+    "Fear": "It's okay to feel scared. You're not alone in this.",
+    "Confused": "Let's try to untangle this together. What's on your mind?",
+    "Burnout": "You've been carrying a lot. It's okay to rest and recharge.",
+    "Critical": "I'm really concerned about you. Please reach out to someone you trust or a helpline. You matter."
+}
+
+def get_fallback_response(mood: str) -> str:
+    """Static reply used when the LLM is unavailable"""
+    return FALLBACK_RESPONSES.get(mood, "I'm here for you. Tell me more about how you're feeling.")
+
+async def generate_response(message: str, mood: str, confidence: float, context: str = "") -> str:
     """
     Generate empathetic AI response based on detected mood
     """
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
         prompt = AI_RESPONSE_PROMPT.format(
             mood=mood,
             confidence=confidence,
+            context=context or NO_CONTEXT,
             message=message
         )
         
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        response_text = await llm_client.generate(prompt, purpose="reply")
+        return response_text.strip()
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"AI response error: {e}")
         
-        # Fallback responses based on mood
-        fallback_responses = {
-            "Happy": "That's wonderful to hear! Keep embracing these positive moments.",
-            "Motivated": "Your energy is inspiring! Channel it towards your goals.",
-            "Neutral": "I'm here whenever you want to talk about anything.",
-            "Sad": "I hear you. It's okay to feel this way. I'm here with you.",
-            "Stressed": "That sounds overwhelming. Let's take this one step at a time.",
-            "Anxious": "I understand that feeling. Try taking a few deep breaths with me.",
-            "Angry": "Your feelings are valid. Let's work through this together.",
-            "Fear": "It's okay to feel scared. You're not alone in this.",
-            "Confused": "Let's try to untangle this together. What's on your mind?",
-            "Burnout": "You've been carrying a lot. It's okay to rest and recharge.",
-            "Critical": "I'm really concerned about you. Please reach out to someone you trust or a helpline. You matter."
-        }
-        
-        return fallback_responses.get(mood, "I'm here for you. Tell me more about how you're feeling.")
\ No newline at end of file
+        REPLY_FALLBACKS.labels("reply").inc()
+        return get_fallback_response(mood)
+
+
+async def stream_response(message: str, mood: str, confidence: float, context: str = ""):
+    """
+    Stream the empathetic reply as text chunks.
+    Falls back to the static reply if nothing could be streamed.
+    """
+    prompt = AI_RESPONSE_PROMPT.format(
+        mood=mood,
+        confidence=confidence,
+        context=context or NO_CONTEXT,
+        message=message
+    )
+    
+    streamed = False
+    try:
+        async for chunk in llm_client.stream(prompt, purpose="reply"):
+            if chunk:
+                streamed = True
+                yield chunk
+    except Exception as e:
+        print(f"AI stream error: {e}")
+    
+    if not streamed:
+        REPLY_FALLBACKS.labels("stream").inc()
+        yield get_fallback_response(mood)
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+from config import settings
+from models.mood import ALLOWED_MOODS
+
+# Streaming chat_logs export. Documents are read with a batched cursor and
+# encoded one batch at a time, so memory stays flat however long the range.
+
+EXPORT_FIELDS = ("timestamp", "mood", "confidence", "mood_source", "message", "ai_reply", "user_id")
+DEFAULT_FIELDS = ("timestamp", "mood", "confidence")
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+class ExportError(ValueError):
+    """Invalid export options (unknown field, mood or format)"""
+
+def parse_fields(fields: str = None) -> tuple:
+    if not fields:
+        return DEFAULT_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ExportError(f"Unknown export fields: {', '.join(unknown)} (choose from {', '.join(EXPORT_FIELDS)})")
+    return selected
+
+def parse_moods(moods: str = None) -> list:
+    if not moods:
+        return []
+    selected = [mood.strip() for mood in moods.split(",") if mood.strip()]
+    unknown = [mood for mood in selected if mood not in ALLOWED_MOODS]
+    if unknown:
+        raise ExportError(f"Unknown moods: {', '.join(unknown)}")
+    return selected
+
+def parse_datetime(value: str = None):
+    """ISO date or date-time ("2024-01-31", "2024-01-31T12:00:00"), UTC"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"Invalid date: {value}")
+
+def build_export_query(user_ids: list = None, start: datetime = None, end: datetime = None, moods: list = None) -> dict:
+    """chat_logs filter for a user, a cohort (several users) or everyone (None)"""
+    query = {}
+    if user_ids is not None:
+        ids = [ObjectId(user_id) for user_id in user_ids]
+        query["user_id"] = ids[0] if len(ids) == 1 else {"$in": ids}
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    if moods:
+        query["mood"] = moods[0] if len(moods) == 1 else {"$in": moods}
+    return query
+
+async def iter_export_batches(db, query: dict, fields: tuple, batch_size: int = None):
+    """
+    Lists of export rows, one per cursor batch. The sort walks the
+    (user_id, timestamp, _id) index backwards: per user, oldest first.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    cursor = db.chat_logs.find(query, projection).sort(
+        [("user_id", -1), ("timestamp", 1), ("_id", 1)]
+    ).batch_size(batch_size)
+
+    try:
+        rows = []
+        async for doc in cursor:
+            rows.append(_export_row(doc, fields))
+            if len(rows) >= batch_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+    finally:
+        await cursor.close()
+
+def _export_row(doc: dict, fields: tuple) -> dict:
+    row = {}
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        row[field] = value
+    return row
+
+def _text_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def encode_ndjson(batches, fields: tuple):
+    async for rows in batches:
+        yield "".join(
+            json.dumps({field: _text_value(row[field]) for field in fields}, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+async def encode_csv(batches, fields: tuple):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for rows in batches:
+        for row in rows:
+            writer.writerow([_text_value(row[field]) for field in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Arrow and Parquet exports need pyarrow: pip install pyarrow")
+    return pyarrow
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(pa, fields: tuple):
+    types = {
+        "timestamp": pa.timestamp("ms"),
+        "confidence": pa.float64(),
+    }
+    return pa.schema([(field, types.get(field, pa.string())) for field in fields])
+
+async def encode_columnar(batches, fields: tuple, file_format: str):
+    """Arrow IPC stream or Parquet, one record batch / row group per cursor batch"""
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa, fields)
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+
+    try:
+        async for rows in batches:
+            columns = [pa.array([row[field] for row in rows], type=schema.field(field).type) for field in fields]
+            batch = pa.RecordBatch.from_arrays(columns, schema=schema)
+            if file_format == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_stream(db, query: dict, fields: tuple, file_format: str, batch_size: int = None):
+    """Async iterator of encoded bytes for the chosen format"""
+    if file_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format: {file_format} (choose from {', '.join(EXPORT_FORMATS)})")
+    if file_format in ("arrow", "parquet"):
+        _import_pyarrow()
+
+    batches = iter_export_batches(db, query, fields, batch_size)
+    if file_format == "ndjson":
+        return encode_ndjson(batches, fields)
+    if file_format == "csv":
+        return encode_csv(batches, fields)
+    return encode_columnar(batches, fields, file_format)
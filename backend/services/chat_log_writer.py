@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from config import settings
+from services.mood_rollups import record_moods
+from services.metrics import stage_timer, CHAT_LOGS_LOST
+from services.response_cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+class ChatLogWriter:
+    """
+    Write-behind buffer for chat logs. Documents are flushed with
+    insert_many(ordered=False) when CHAT_LOG_BATCH_SIZE are queued or
+    CHAT_LOG_FLUSH_INTERVAL_MS has passed. The queue is bounded, so a
+    slow database makes enqueue() wait instead of growing memory.
+    Failed writes are retried with backoff, then inserted one document
+    at a time; only what still fails is dropped (and counted as lost).
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int,
+                 max_retries: int = 3, retry_backoff: float = 0.2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self._db = None
+        self._stopping = False
+        self.stats_counters = {
+            "enqueued": 0, "written": 0, "lost": 0, "retries": 0, "batches": 0,
+            "backpressure_waits": 0, "last_flush_ms": 0.0, "total_flush_ms": 0.0
+        }
+
+    def start(self, db):
+        self._db = db
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, chat_log: dict):
+        if self._queue.full():
+            self.stats_counters["backpressure_waits"] += 1
+        await self._queue.put(chat_log)
+        self.stats_counters["enqueued"] += 1
+
+    async def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+            
+            # Give a partial batch one interval to fill up
+            if self._queue.qsize() + 1 < self.batch_size and not self._stopping:
+                await asyncio.sleep(self.flush_interval)
+            
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+
+    async def _insert_batch(self, docs: list) -> tuple:
+        """One insert_many(ordered=False): (written, not written, error)"""
+        try:
+            with stage_timer("db_chat_logs_insert_many"):
+                await self._db.chat_logs.insert_many(docs, ordered=False)
+            return docs, [], None
+        except BulkWriteError as e:
+            # Everything except the reported documents was written. _ids are
+            # assigned client-side, so a duplicate key means an earlier,
+            # ambiguous attempt already wrote that document.
+            failed = {
+                error["index"] for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY
+            }
+            return (
+                [doc for i, doc in enumerate(docs) if i not in failed],
+                [doc for i, doc in enumerate(docs) if i in failed],
+                e
+            )
+        except Exception as e:
+            # Some documents may have been written; a retry reports them as duplicates
+            return [], docs, e
+
+    async def _insert_one_by_one(self, docs: list) -> tuple:
+        """Last resort, so one bad document cannot sink the rest of the batch"""
+        written, unwritten, last_error = [], [], None
+        for doc in docs:
+            try:
+                await self._db.chat_logs.insert_one(doc)
+                written.append(doc)
+            except DuplicateKeyError:
+                written.append(doc)
+            except Exception as e:
+                unwritten.append(doc)
+                last_error = e
+        return written, unwritten, last_error
+
+    async def _flush(self, batch: list):
+        start = time.perf_counter()
+        counters = self.stats_counters
+        inserted, pending, error = [], batch, None
+        
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                counters["retries"] += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            written, pending, error = await self._insert_batch(pending)
+            inserted += written
+            if not pending:
+                break
+            logger.warning(
+                "Chat log batch: %d of %d logs not written (attempt %d): %s",
+                len(pending), len(batch), attempt + 1, error
+            )
+        
+        if pending:
+            written, pending, error = await self._insert_one_by_one(pending)
+            inserted += written
+        
+        if pending:
+            counters["lost"] += len(pending)
+            CHAT_LOGS_LOST.inc(len(pending))
+            logger.error("Chat log batch: %d of %d logs lost after retries: %s", len(pending), len(batch), error)
+            for doc in pending:
+                logger.error("Lost chat log: user_id=%s timestamp=%s mood=%s", doc.get("user_id"), doc.get("timestamp"), doc.get("mood"))
+        
+        if inserted:
+            try:
+                with stage_timer("db_mood_rollup_batch"):
+                    await record_moods(self._db, inserted)
+            except Exception as e:
+                logger.error("Mood rollup batch error: %s", e)
+            # The chat history changed whether or not the rollup made it
+            try:
+                await bump_version(*{doc["user_id"] for doc in inserted})
+            except Exception as e:
+                logger.error("Response cache version bump error: %s", e)
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        counters["batches"] += 1
+        counters["written"] += len(inserted)
+        counters["last_flush_ms"] = round(elapsed_ms, 2)
+        counters["total_flush_ms"] += elapsed_ms
+
+    async def stop(self):
+        """Flush everything still queued (called on shutdown)"""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        counters = self.stats_counters
+        return {
+            **{k: v for k, v in counters.items() if k != "total_flush_ms"},
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "avg_flush_ms": round(counters["total_flush_ms"] / counters["batches"], 2) if counters["batches"] else 0.0
+        }
+
+chat_log_writer = ChatLogWriter(
+    batch_size=settings.CHAT_LOG_BATCH_SIZE,
+    flush_interval=settings.CHAT_LOG_FLUSH_INTERVAL_MS / 1000,
+    max_queue=settings.CHAT_LOG_QUEUE_MAX,
+    max_retries=settings.CHAT_LOG_FLUSH_RETRIES,
+    retry_backoff=settings.CHAT_LOG_RETRY_BACKOFF_MS / 1000
+)
@@ -0,0 +1,168 @@
+import asyncio
+
+from config import settings
+from models.mood import CombinedMoodReply
+from services import llm_client
+from services.llm_client import LLMOverloadedError
+from services.mood_classifier import (
+    classify_mood, classify_locally, mood_result_from, fallback_mood_result
+)
+from services.llm_parsing import parse_llm_json, prompt_version
+from services.ai_responder import generate_response, get_fallback_response, NO_CONTEXT
+from services.conversation_context import prompt_context, record_turn
+from services.mood_rollups import record_mood
+from services.chat_log_writer import chat_log_writer
+from services.response_cache import bump_version
+from services.metrics import stage_timer, MOOD_RESULTS, REPLY_FALLBACKS
+
+PIPELINE_MODES = ("sequential", "combined")
+
+COMBINED_PROMPT = """
+You are MindScope AI, an empathetic emotional wellbeing companion.
+
+Step 1 - Classify the user's emotional state into exactly ONE of the following:
+Happy, Motivated, Neutral, Sad, Stressed, Anxious, Angry, Fear, Confused, Burnout
+If the message contains self-harm, suicide, or emergency intent, classify as "Critical".
+No medical diagnosis, no new labels, choose the closest emotion.
+
+Step 2 - Write a reply to the user for that mood:
+- Use a calm, supportive, and warm tone
+- Do NOT give medical or clinical advice
+- Do NOT diagnose any condition
+- Do NOT exaggerate positivity for negative moods
+- Keep the reply under 80 words
+- End with a gentle supportive or reflective sentence
+- Be human, not robotic
+- For Critical mood: express care and concern, encourage reaching out to a
+  trusted person, mention that professional help is available, and do NOT
+  provide any harmful information
+
+Conversation so far (background for the reply only - classify the latest message alone):
+{context}
+
+User message:
+"{message}"
+
+Output ONLY valid JSON:
+{{
+  "mood": "<one label from the list>",
+  "confidence": <number between 0.0 and 1.0>,
+  "quote": "<one short motivational or supportive quote matching the mood>",
+  "reply": "<your reply to the user>"
+}}
+"""
+
+COMBINED_PROMPT_VERSION = prompt_version(COMBINED_PROMPT)
+
+# Background chat log writes still in flight
+_pending_writes = set()
+
+def is_pipelined() -> bool:
+    return settings.CHAT_PIPELINE_MODE == "combined"
+
+async def classify_and_respond(message: str, context: str = "") -> tuple:
+    """
+    Single structured LLM call returning mood, confidence, quote and reply
+    """
+    try:
+        prompt = COMBINED_PROMPT.format(message=message, context=context or NO_CONTEXT)
+        
+        response_text = await llm_client.generate(prompt, purpose="combined")
+        result = parse_llm_json(response_text, CombinedMoodReply, "combined", COMBINED_PROMPT_VERSION)
+        
+        mood_result = mood_result_from(result)
+        
+        reply = result.reply.strip()
+        if not reply:
+            REPLY_FALLBACKS.labels("combined").inc()
+            reply = get_fallback_response(mood_result["mood"])
+        
+        return mood_result, reply
+        
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Combined pipeline error: {e}")
+        REPLY_FALLBACKS.labels("combined").inc()
+        mood_result = fallback_mood_result()
+        return mood_result, get_fallback_response(mood_result["mood"])
+
+async def process_message(message: str, user_id: str = None) -> tuple:
+    """
+    Run the configured pipeline and return (mood_result, ai_response).
+    With a user_id the reply sees the user's conversation context, which
+    is loaded while the mood is being classified.
+    """
+    context_task = asyncio.ensure_future(prompt_context(user_id))
+    try:
+        if is_pipelined():
+            mood_result = classify_locally(message)
+            if mood_result is None:
+                context = await context_task
+                with stage_timer("classify_and_reply"):
+                    mood_result, ai_response = await classify_and_respond(message, context)
+                MOOD_RESULTS.labels(mood_result["source"]).inc()
+                return mood_result, ai_response
+        else:
+            with stage_timer("classify"):
+                mood_result = await classify_mood(message)
+        MOOD_RESULTS.labels(mood_result["source"]).inc()
+        
+        context = await context_task
+    finally:
+        context_task.cancel()
+    
+    with stage_timer("reply"):
+        ai_response = await generate_response(
+            message=message,
+            mood=mood_result["mood"],
+            confidence=mood_result["confidence"],
+            context=context
+        )
+    return mood_result, ai_response
+
+async def _insert_chat_log(db, chat_log: dict):
+    """
+    Insert the log and fold it into the user's mood_daily rollup. The
+    rollup $inc is not idempotent, so it stays inline rather than going
+    through the (retrying, possibly in-memory) job runner.
+    """
+    with stage_timer("db_chat_logs_insert"):
+        await db.chat_logs.insert_one(chat_log)
+    try:
+        with stage_timer("db_mood_rollup"):
+            await record_mood(db, chat_log["user_id"], chat_log["mood"], chat_log["timestamp"])
+    finally:
+        # The chat history changed whether or not the rollup made it
+        await bump_version(chat_log["user_id"])
+
+async def _write_chat_log(db, chat_log: dict):
+    try:
+        await _insert_chat_log(db, chat_log)
+    except Exception as e:
+        print(f"Chat log write error: {e}")
+
+async def save_chat_log(db, chat_log: dict):
+    """
+    Persist a chat log. With write-behind enabled it is queued for a
+    batched insert; in pipelined mode the insert is scheduled in the
+    background; otherwise it is written inline.
+    """
+    await record_turn(chat_log)
+    
+    if settings.CHAT_LOG_WRITE_BEHIND:
+        await chat_log_writer.enqueue(chat_log)
+        return
+    
+    if not is_pipelined():
+        await _insert_chat_log(db, chat_log)
+        return
+    
+    task = asyncio.create_task(_write_chat_log(db, chat_log))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+async def drain_pending_writes():
+    """Wait for background chat log writes (called on shutdown)"""
+    if _pending_writes:
+        await asyncio.gather(*_pending_writes, return_exceptions=True)
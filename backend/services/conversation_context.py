@@ -0,0 +1,200 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from config import settings
+from database import get_database
+from services import llm_client
+from services.llm_client import CHARS_PER_TOKEN
+from services.job_runner import job_runner, PRIORITY_LOW
+from services.metrics import stage_timer
+from services.shared_store import create_store
+
+# Per-user conversation state, kept in the shared store:
+# {"turns": [...last CONTEXT_TURNS turns...],
+#  "pending": [...turns that left the window, not yet summarized...],
+#  "summary": "..."}
+# A turn is {"m": message, "r": reply, "t": ISO timestamp}. Summaries are
+# persisted in conversation_summaries with the timestamp they cover up to.
+
+SUMMARY_PROMPT = """
+You maintain a short private summary of a user's conversation with MindScope AI,
+an emotional wellbeing companion. It is used as context for future replies.
+
+Current summary:
+{summary}
+
+Newer conversation turns:
+{turns}
+
+Write the updated summary in at most {words} words: recurring feelings,
+important events or people, and what has helped. No diagnosis, no quotes,
+no advice. Output only the summary text.
+"""
+
+# Turns kept for summarizing beyond this are dropped, oldest first
+MAX_PENDING_TURNS = 4 * settings.CONTEXT_SUMMARY_EVERY
+
+# A summary job may run in another worker process, so "already being
+# summarized" is a flag in the shared store. The job clears it; the TTL
+# frees it if the job never finishes.
+SUMMARY_LOCK_SECONDS = 300
+
+_contexts = create_store("context", settings.CONTEXT_CACHE_SIZE, settings.CONTEXT_CACHE_TTL)
+_summarizing = create_store("summarizing", settings.CONTEXT_CACHE_SIZE, SUMMARY_LOCK_SECONDS)
+_stats = {"loads": 0, "summaries": 0, "summary_errors": 0, "clipped": 0}
+
+def _turn(message: str, reply: str, timestamp: datetime) -> dict:
+    return {"m": message, "r": reply, "t": timestamp.isoformat(timespec="microseconds")}
+
+def format_turns(turns: list) -> str:
+    return "\n".join(f"User: {turn['m']}\nMindScope: {turn['r']}" for turn in turns)
+
+def _clip(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 3, 0)].rstrip() + "..."
+
+def build_prompt_context(state: dict, max_tokens: int = None) -> str:
+    """
+    Summary plus as many of the newest turns as fit in the token budget
+    (estimated from length). The summary may use at most half of it.
+    """
+    budget = (settings.CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens) * CHARS_PER_TOKEN
+    parts = []
+
+    summary = state.get("summary")
+    if summary:
+        summary = f"Summary of earlier conversation: {_clip(summary, budget // 2)}"
+        parts.append(summary)
+        budget -= len(summary)
+
+    recent = []
+    for turn in reversed(state.get("turns", [])):
+        text = format_turns([turn])
+        if len(text) > budget:
+            # Always keep part of the latest turn rather than nothing
+            if not recent and budget > 80:
+                recent.append(_clip(text, budget))
+                _stats["clipped"] += 1
+            break
+        recent.append(text)
+        budget -= len(text) + 1
+
+    if recent:
+        parts.append("\n".join(reversed(recent)))
+    return "\n\n".join(parts)
+
+async def _load_state(user_id: str) -> dict:
+    """Rebuild a user's state from the stored summary and the logs after it"""
+    db = get_database()
+    _stats["loads"] += 1
+    with stage_timer("db_context_load"):
+        summary_doc = await db.conversation_summaries.find_one({"_id": user_id}) or {}
+        query = {"user_id": ObjectId(user_id)}
+        if summary_doc.get("covered_until"):
+            query["timestamp"] = {"$gt": summary_doc["covered_until"]}
+        logs = await db.chat_logs.find(
+            query, {"message": 1, "ai_reply": 1, "timestamp": 1}
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(settings.CONTEXT_TURNS + MAX_PENDING_TURNS).to_list(None)
+
+    turns = [_turn(log["message"], log.get("ai_reply", ""), log["timestamp"]) for log in reversed(logs)]
+    split = max(len(turns) - settings.CONTEXT_TURNS, 0)
+    return {"turns": turns[split:], "pending": turns[:split], "summary": summary_doc.get("summary", "")}
+
+async def prompt_context(user_id: str) -> str:
+    """Bounded conversation context for the user's next reply prompt"""
+    if not settings.CONTEXT_ENABLED or not user_id:
+        return ""
+    try:
+        state = await _contexts.get(user_id) if settings.CONTEXT_CACHE_TTL > 0 else None
+        if state is None:
+            state = await _load_state(user_id)
+            if settings.CONTEXT_CACHE_TTL > 0:
+                await _contexts.set(user_id, state)
+        return build_prompt_context(state)
+    except Exception as e:
+        print(f"Conversation context error: {e}")
+        return ""
+
+async def record_turn(chat_log: dict):
+    """
+    Append a saved turn to the cached window. Turns pushed out of the
+    window are folded into the summary in the background once
+    CONTEXT_SUMMARY_EVERY of them have piled up. With the cache off
+    (CONTEXT_CACHE_TTL=0) the window is loaded from chat_logs instead.
+    """
+    if not settings.CONTEXT_ENABLED:
+        return
+    user_id = str(chat_log["user_id"])
+    try:
+        if settings.CONTEXT_CACHE_TTL > 0:
+            state = await _contexts.get(user_id)
+            if state is None:
+                # Not cached: the next prompt_context() reloads from chat_logs
+                return
+        else:
+            # Called before the log is inserted, so the load does not include it
+            state = await _load_state(user_id)
+
+        state["turns"].append(_turn(chat_log["message"], chat_log["ai_reply"], chat_log["timestamp"]))
+        overflow = len(state["turns"]) - settings.CONTEXT_TURNS
+        if overflow > 0:
+            state["pending"].extend(state["turns"][:overflow])
+            state["turns"] = state["turns"][overflow:]
+            state["pending"] = state["pending"][-MAX_PENDING_TURNS:]
+        if settings.CONTEXT_CACHE_TTL > 0:
+            await _contexts.set(user_id, state)
+
+        if len(state["pending"]) >= settings.CONTEXT_SUMMARY_EVERY:
+            # incr is atomic in both backends: only the first caller gets 1
+            flag, _ = await _summarizing.incr(user_id, SUMMARY_LOCK_SECONDS)
+            if flag != 1:
+                return
+            payload = {"user_id": user_id, "summary": state["summary"], "pending": list(state["pending"])}
+            # One attempt: on failure the turns stay pending and the next turn retries
+            if not await job_runner.submit("conversation_summary", payload, priority=PRIORITY_LOW, max_attempts=1):
+                await _summarizing.delete(user_id)
+    except Exception as e:
+        print(f"Conversation context error: {e}")
+
+async def _summarize_job(payload: dict):
+    """Fold pending turns into the summary, off the response path"""
+    user_id, summary, pending = payload["user_id"], payload["summary"], payload["pending"]
+    try:
+        prompt = SUMMARY_PROMPT.format(
+            summary=summary or "(none yet)",
+            turns=format_turns(pending),
+            words=settings.CONTEXT_SUMMARY_MAX_TOKENS * 3 // 4
+        )
+        text = await llm_client.generate(prompt, purpose="summary")
+        new_summary = _clip(" ".join(text.split()), settings.CONTEXT_SUMMARY_MAX_TOKENS * CHARS_PER_TOKEN)
+        covered_until = pending[-1]["t"]
+
+        await get_database().conversation_summaries.update_one(
+            {"_id": user_id},
+            {"$set": {
+                "summary": new_summary,
+                "covered_until": datetime.fromisoformat(covered_until),
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+        state = await _contexts.get(user_id)
+        if state is not None:
+            state["summary"] = new_summary
+            state["pending"] = [turn for turn in state["pending"] if turn["t"] > covered_until]
+            await _contexts.set(user_id, state)
+        _stats["summaries"] += 1
+    except Exception as e:
+        # Pending turns stay queued and are retried after the next turn
+        _stats["summary_errors"] += 1
+        print(f"Conversation summary error: {e}")
+    finally:
+        await _summarizing.delete(user_id)
+
+job_runner.register("conversation_summary", _summarize_job)
+
+def context_stats() -> dict:
+    return {**_stats, "cache": _contexts.stats()}
@@ -0,0 +1,300 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from config import settings
+from services.metrics import JOBS, JOB_LAG_SECONDS, JOB_SECONDS
+
+# Priorities: lower runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+class Job:
+    __slots__ = ("name", "payload", "priority", "attempts", "max_attempts", "ready_at", "id")
+
+    def __init__(self, name: str, payload: dict, priority: int, max_attempts: int,
+                 attempts: int = 0, ready_at: float = None, id=None):
+        self.name = name
+        self.payload = payload
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.attempts = attempts
+        self.ready_at = time.time() if ready_at is None else ready_at
+        self.id = id
+
+class JobRunner:
+    """
+    In-process worker pool for deferred, non-user-facing work (summaries,
+    cache warming...). Jobs are a registered handler name plus a
+    BSON-friendly payload dict, run by priority with retries and
+    exponential backoff, so handlers must be idempotent: a job can run
+    again after a retry or an expired lease, and in-memory jobs are lost
+    if the process dies.
+
+    The default queue is a bounded in-memory priority queue; submit()
+    returns False when it is full (or the runner is not started) so the
+    caller can do the work inline instead. With JOBS_PERSISTENT the jobs
+    collection is the queue: workers claim documents with a lease, so
+    queued jobs survive restarts and are shared by every worker process.
+    The lease is renewed while a job runs; a job whose worker dies is
+    claimed again once the lease runs out, up to its max_attempts.
+    """
+
+    def __init__(self, workers: int, max_queue: int, max_attempts: int, retry_backoff: float,
+                 drain_timeout: float, persistent: bool = False, poll_interval: float = 1.0, lease: float = 60.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.drain_timeout = drain_timeout
+        self.persistent = persistent
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._handlers = {}
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._retries = {}  # id(job) -> (job, TimerHandle) for backoff delays
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._collection = None
+        self._draining = False
+        self._running = 0
+        self._persisted_backlog = 0
+        self.stats_counters = {"submitted": 0, "completed": 0, "retried": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks) and not self._draining
+
+    def register(self, name: str, handler):
+        """handler(payload) -> awaitable; raising schedules a retry"""
+        self._handlers[name] = handler
+
+    def start(self, db=None):
+        if self.persistent:
+            self._collection = db.jobs
+        self._draining = False
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, name: str, payload: dict, priority: int = PRIORITY_NORMAL, max_attempts: int = None) -> bool:
+        """Queue a job. False when the queue is full or not running: run it inline."""
+        if name not in self._handlers:
+            raise KeyError(f"No job handler registered for {name!r}")
+        if not self.started or self._backlog() >= self.max_queue:
+            self.stats_counters["rejected"] += 1
+            JOBS.labels(name, "rejected").inc()
+            return False
+
+        job = Job(name, payload, priority, max_attempts or self.max_attempts)
+        if self.persistent:
+            now = datetime.utcnow()
+            await self._collection.insert_one({
+                "name": name, "payload": payload, "priority": priority, "status": "queued",
+                "attempts": 0, "max_attempts": job.max_attempts, "available_at": now, "created_at": now
+            })
+            self._persisted_backlog += 1
+            self._wakeup.set()
+        else:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        self.stats_counters["submitted"] += 1
+        return True
+
+    def _backlog(self) -> int:
+        if self.persistent:
+            return self._persisted_backlog
+        return self._queue.qsize() + len(self._retries)
+
+    async def _next(self):
+        """Next runnable job, or None once draining and nothing is ready"""
+        if not self.persistent:
+            if self._draining and self._queue.empty():
+                return None
+            _, _, job = await self._queue.get()
+            return job
+
+        while True:
+            job = await self._claim()
+            if job is not None or self._draining:
+                return job
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self):
+        """Lease the highest-priority ready job (or one whose lease ran out)"""
+        while True:
+            now = datetime.utcnow()
+            doc = await self._collection.find_one_and_update(
+                {"$or": [
+                    {"status": "queued", "available_at": {"$lte": now}},
+                    {"status": "running", "locked_until": {"$lt": now}}
+                ]},
+                {"$set": {"status": "running", "locked_until": now + timedelta(seconds=self.lease)}, "$inc": {"attempts": 1}},
+                sort=[("priority", 1), ("available_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                self._persisted_backlog = await self._collection.count_documents({"status": "queued"})
+                return None
+            if doc["attempts"] <= doc.get("max_attempts", self.max_attempts):
+                break
+            # Attempts are counted at claim time, so a job that keeps killing
+            # its worker (and never reaches _failed) runs out of attempts here
+            await self._give_up(doc, now)
+        
+        self._persisted_backlog = max(self._persisted_backlog - 1, 0)
+        return Job(
+            doc["name"], doc.get("payload", {}), doc.get("priority", PRIORITY_NORMAL),
+            doc.get("max_attempts", self.max_attempts), attempts=doc["attempts"] - 1,
+            ready_at=doc["available_at"].replace(tzinfo=timezone.utc).timestamp(), id=doc["_id"]
+        )
+
+    async def _give_up(self, doc: dict, now: datetime):
+        attempts = doc["attempts"] - 1
+        self.stats_counters["failed"] += 1
+        JOBS.labels(doc["name"], "failed").inc()
+        print(f"Job {doc['name']} failed after {attempts} attempt(s): lease expired")
+        await self._collection.update_one({"_id": doc["_id"]}, {"$set": {
+            "status": "failed", "attempts": attempts, "failed_at": now,
+            "error": doc.get("error") or "lease expired: the worker died or the job outran its lease"
+        }})
+
+    async def _renew_lease(self, job: Job):
+        """Keep extending a running job's lease so a long job is not claimed twice"""
+        while True:
+            await asyncio.sleep(self.lease / 2)
+            try:
+                await self._collection.update_one(
+                    {"_id": job.id, "status": "running"},
+                    {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=self.lease)}}
+                )
+            except Exception as e:
+                print(f"Job lease renewal error: {e}")
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self._next()
+            except Exception as e:
+                print(f"Job queue error: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if job is None:
+                return
+            try:
+                await self._execute(job)
+            except Exception as e:
+                # Only the persistent bookkeeping can fail here; an unfinished
+                # job is claimed again once its lease runs out
+                print(f"Job queue error: {e}")
+            finally:
+                if not self.persistent:
+                    self._queue.task_done()
+
+    async def _execute(self, job: Job):
+        job.attempts += 1
+        JOB_LAG_SECONDS.labels(job.name).observe(max(time.time() - job.ready_at, 0.0))
+        self._running += 1
+        renewal = asyncio.create_task(self._renew_lease(job)) if self.persistent else None
+        try:
+            handler = self._handlers.get(job.name)
+            if handler is None:
+                raise KeyError(f"No job handler registered for {job.name!r}")
+            with JOB_SECONDS.labels(job.name).time():
+                await handler(job.payload)
+        except Exception as e:
+            await self._failed(job, e)
+        else:
+            self.stats_counters["completed"] += 1
+            JOBS.labels(job.name, "ok").inc()
+            if self.persistent:
+                await self._collection.delete_one({"_id": job.id})
+        finally:
+            if renewal is not None:
+                renewal.cancel()
+            self._running -= 1
+
+    async def _failed(self, job: Job, error: Exception):
+        if job.attempts >= job.max_attempts or job.name not in self._handlers:
+            self.stats_counters["failed"] += 1
+            JOBS.labels(job.name, "failed").inc()
+            print(f"Job {job.name} failed after {job.attempts} attempt(s): {error}")
+            if self.persistent:
+                await self._collection.update_one({"_id": job.id}, {"$set": {
+                    "status": "failed", "attempts": job.attempts, "error": str(error), "failed_at": datetime.utcnow()
+                }})
+            return
+
+        self.stats_counters["retried"] += 1
+        JOBS.labels(job.name, "retried").inc()
+        # While draining, retry straight away so the drain covers it
+        delay = 0.0 if self._draining else self.retry_backoff * 2 ** (job.attempts - 1)
+        job.ready_at = time.time() + delay
+        if self.persistent:
+            await self._collection.update_one({"_id": job.id}, {"$set": {
+                "status": "queued", "attempts": job.attempts, "error": str(error),
+                "available_at": datetime.utcnow() + timedelta(seconds=delay)
+            }})
+        elif delay:
+            timer = asyncio.get_running_loop().call_later(delay, self._requeue, job)
+            self._retries[id(job)] = (job, timer)
+        else:
+            self._queue.put_nowait((job.priority, next(self._sequence), job))
+
+    def _requeue(self, job: Job):
+        self._retries.pop(id(job), None)
+        self._queue.put_nowait((job.priority, next(self._sequence), job))
+
+    async def stop(self):
+        """
+        Graceful drain (called on shutdown): stop accepting jobs, run
+        everything ready - pending retries included - for up to
+        JOBS_DRAIN_TIMEOUT, then cancel the workers. Persistent jobs left
+        over stay queued for the next start.
+        """
+        if not self._tasks:
+            return
+        self._draining = True
+        for job, timer in list(self._retries.values()):
+            timer.cancel()
+            self._requeue(job)
+        self._wakeup.set()
+
+        try:
+            if self.persistent:
+                await asyncio.wait_for(asyncio.gather(*self._tasks), timeout=self.drain_timeout)
+            else:
+                await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"Job runner drain timed out with {self._backlog()} job(s) queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            **self.stats_counters,
+            "queued": self._backlog(),
+            "running": self._running,
+            "workers": len(self._tasks),
+            "queue_max": self.max_queue,
+            "persistent": self.persistent
+        }
+
+job_runner = JobRunner(
+    workers=settings.JOBS_WORKERS,
+    max_queue=settings.JOBS_QUEUE_MAX,
+    max_attempts=settings.JOBS_MAX_ATTEMPTS,
+    retry_backoff=settings.JOBS_RETRY_BACKOFF_MS / 1000,
+    drain_timeout=settings.JOBS_DRAIN_TIMEOUT,
+    persistent=settings.JOBS_PERSISTENT,
+    poll_interval=settings.JOBS_POLL_INTERVAL_MS / 1000,
+    lease=settings.JOBS_LEASE_SECONDS
+)
@@ -0,0 +1,218 @@
+import asyncio
+import google.generativeai as genai
+
+from config import settings
+from services.metrics import LLM_REQUESTS, LLM_TOKENS, LLM_COST
+from services.resilience import CircuitBreaker, CircuitOpenError, call_with_retries, is_retryable
+
+# Configure Gemini once for every service
+genai.configure(api_key=settings.GEMINI_API_KEY)
+
+class LLMOverloadedError(Exception):
+    """Raised when no LLM slot frees up within LLM_QUEUE_TIMEOUT"""
+
+# Gemini bills per token; the SDK in use does not report usage, so
+# tokens are estimated from the text length
+CHARS_PER_TOKEN = 4
+
+class GeminiBackend:
+    """Shared GenerativeModel called through the non-blocking async API"""
+
+    def __init__(self, model_name: str):
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str):
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+_backend = None
+_semaphore = None
+_stats = {"in_flight": 0, "waiting": 0, "rejected": 0, "timeouts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+# Trips to the static fallbacks while Gemini is unhealthy
+breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RECOVERY)
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = GeminiBackend(settings.GEMINI_MODEL)
+    return _backend
+
+def set_backend(backend):
+    """Swap the LLM backend (used by benchmarks with a local stub)"""
+    global _backend
+    _backend = backend
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def _acquire_slot():
+    """
+    Wait up to LLM_QUEUE_TIMEOUT for a free slot, then reject
+    so callers can answer 429 instead of piling up requests
+    """
+    semaphore = _get_semaphore()
+    if settings.LLM_QUEUE_TIMEOUT <= 0:
+        # No queueing: take a free slot right away or reject. wait_for with
+        # timeout=0 would time out even when a slot is free.
+        if semaphore.locked():
+            _stats["rejected"] += 1
+            raise LLMOverloadedError("LLM concurrency limit reached")
+        await semaphore.acquire()
+        return
+    
+    _stats["waiting"] += 1
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=settings.LLM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["rejected"] += 1
+        raise LLMOverloadedError("LLM concurrency limit reached")
+    finally:
+        _stats["waiting"] -= 1
+
+def _outcome(error: Exception) -> str:
+    if isinstance(error, LLMOverloadedError):
+        return "overloaded"
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    return "error"
+
+def _record_usage(purpose: str, prompt_chars: int, completion_chars: int):
+    prompt_tokens = prompt_chars / CHARS_PER_TOKEN
+    completion_tokens = completion_chars / CHARS_PER_TOKEN
+    LLM_TOKENS.labels(purpose, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(purpose, "completion").inc(completion_tokens)
+    LLM_COST.labels(purpose).inc(
+        prompt_tokens / 1000 * settings.LLM_COST_PER_1K_PROMPT_TOKENS
+        + completion_tokens / 1000 * settings.LLM_COST_PER_1K_COMPLETION_TOKENS
+    )
+
+async def generate(prompt: str, timeout: float = None, purpose: str = "other") -> str:
+    """
+    Run one prompt through the shared backend with bounded concurrency,
+    retries/hedging inside an overall deadline and a circuit breaker.
+    Returns the raw response text. `purpose` labels the call's metrics.
+    """
+    try:
+        text = await _generate(prompt, timeout)
+    except Exception as e:
+        LLM_REQUESTS.labels(purpose, _outcome(e)).inc()
+        raise
+    LLM_REQUESTS.labels(purpose, "ok").inc()
+    _record_usage(purpose, len(prompt), len(text))
+    return text
+
+async def _generate(prompt: str, timeout: float = None) -> str:
+    breaker.before_call()
+    try:
+        await _acquire_slot()
+    except LLMOverloadedError:
+        breaker.release()
+        raise
+    
+    _stats["in_flight"] += 1
+    backend = get_backend()
+    try:
+        text = await call_with_retries(
+            lambda: backend.generate(prompt),
+            deadline=timeout or settings.LLM_TIMEOUT,
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT,
+            base_delay=settings.LLM_RETRY_BASE_DELAY,
+            max_delay=settings.LLM_RETRY_MAX_DELAY,
+            hedge_after=settings.LLM_HEDGE_AFTER,
+            stats=_stats
+        )
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            _stats["timeouts"] += 1
+        if is_retryable(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+        _get_semaphore().release()
+    
+    breaker.record_success()
+    return text
+
+async def stream(prompt: str, timeout: float = None, purpose: str = "other"):
+    """
+    Stream response text chunks from the shared backend. The slot is
+    held for the whole stream and the timeout applies between chunks.
+    Streams are not retried, but their failures count for the breaker.
+    """
+    chunks = _stream(prompt, timeout)
+    completion_chars = 0
+    try:
+        async for chunk in chunks:
+            completion_chars += len(chunk)
+            yield chunk
+    except Exception as e:
+        LLM_REQUESTS.labels(purpose, _outcome(e)).inc()
+        raise
+    else:
+        LLM_REQUESTS.labels(purpose, "ok").inc()
+    finally:
+        await chunks.aclose()
+        if completion_chars:
+            _record_usage(purpose, len(prompt), completion_chars)
+
+async def _stream(prompt: str, timeout: float = None):
+    breaker.before_call()
+    try:
+        await _acquire_slot()
+    except LLMOverloadedError:
+        breaker.release()
+        raise
+    
+    _stats["in_flight"] += 1
+    chunks = get_backend().stream(prompt)
+    healthy = None
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(
+                    chunks.__anext__(),
+                    timeout=timeout or settings.LLM_TIMEOUT
+                )
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                _stats["timeouts"] += 1
+                raise
+            healthy = True
+            yield chunk
+        healthy = True
+    except Exception as e:
+        if is_retryable(e):
+            healthy = False
+        raise
+    finally:
+        await chunks.aclose()
+        _stats["in_flight"] -= 1
+        _get_semaphore().release()
+        if healthy is True:
+            breaker.record_success()
+        elif healthy is False:
+            breaker.record_failure()
+        else:
+            breaker.release()
+
+def stats() -> dict:
+    return {**_stats, "limit": settings.LLM_MAX_CONCURRENCY, "circuit": breaker.stats()}
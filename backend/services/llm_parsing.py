@@ -0,0 +1,176 @@
+import hashlib
+import json
+from collections import defaultdict
+
+from pydantic import BaseModel, ValidationError
+
+class LLMParseError(ValueError):
+    """Raised when an LLM response holds no JSON value matching the schema"""
+
+# Outcome counters per (prompt name, prompt version):
+# ok = clean JSON, repaired = found inside prose/fences or fixed trailing
+# commas, failed = no usable JSON, invalid = JSON that failed the schema
+_parse_stats = defaultdict(lambda: {"ok": 0, "repaired": 0, "failed": 0, "invalid": 0, "invalid_items": 0})
+
+def prompt_version(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()[:12]
+
+def _scan_value(text: str, start: int) -> tuple:
+    """
+    From the opening bracket at `start`, find the index just past its
+    matching closer. Returns (end, has_trailing_comma); end is -1 if
+    the value is never closed.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    last_significant = ""
+    trailing_comma = False
+
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                last_significant = '"'
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            if last_significant == ",":
+                trailing_comma = True
+            depth -= 1
+            if depth == 0:
+                return i + 1, trailing_comma
+        elif char.isspace():
+            continue
+        last_significant = char
+
+    return -1, trailing_comma
+
+def _strip_trailing_commas(candidate: str) -> str:
+    """Drop commas that directly precede a closing bracket (outside strings)"""
+    out = []
+    in_string = False
+    escaped = False
+    pending_comma = None
+
+    for char in candidate:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "}]":
+                out.append(",")
+            out.extend(pending_comma)
+            pending_comma = None
+
+        if char == ",":
+            pending_comma = []
+            continue
+        if char == '"':
+            in_string = True
+        out.append(char)
+
+    return "".join(out)
+
+def extract_json(text: str) -> tuple:
+    """
+    Find the first JSON object or array in an LLM response, tolerating
+    surrounding prose, markdown fences anywhere and trailing commas.
+    Returns (value, repaired).
+    """
+    stripped = text.strip()
+    if stripped[:1] in ("{", "["):
+        try:
+            return json.loads(stripped, strict=False), False
+        except ValueError:
+            pass
+
+    position = 0
+    while True:
+        brace = text.find("{", position)
+        bracket = text.find("[", position)
+        if brace < 0 and bracket < 0:
+            raise LLMParseError("no JSON value in response")
+        start = bracket if brace < 0 or (0 <= bracket < brace) else brace
+
+        end, trailing_comma = _scan_value(text, start)
+        if end > 0:
+            candidate = text[start:end]
+            if trailing_comma:
+                candidate = _strip_trailing_commas(candidate)
+            try:
+                return json.loads(candidate, strict=False), True
+            except ValueError:
+                pass
+        position = start + 1
+
+def parse_llm_json(text: str, schema: type, prompt_name: str, version: str) -> BaseModel:
+    """Extract and validate a single JSON object against a Pydantic schema"""
+    stats = _parse_stats[(prompt_name, version)]
+    try:
+        value, repaired = extract_json(text)
+    except LLMParseError:
+        stats["failed"] += 1
+        raise
+
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    try:
+        parsed = schema.model_validate(value)
+    except ValidationError as e:
+        stats["invalid"] += 1
+        raise LLMParseError(f"response does not match {schema.__name__}: {e.error_count()} errors")
+
+    stats["repaired" if repaired else "ok"] += 1
+    return parsed
+
+def parse_llm_json_list(text: str, item_schema: type, prompt_name: str, version: str) -> list:
+    """
+    Extract a JSON array and validate each item on its own.
+    Invalid items come back as None so callers can fall back per item.
+    """
+    stats = _parse_stats[(prompt_name, version)]
+    try:
+        value, repaired = extract_json(text)
+    except LLMParseError:
+        stats["failed"] += 1
+        raise
+
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        stats["invalid"] += 1
+        raise LLMParseError("response is not a JSON array")
+
+    items = []
+    for item in value:
+        try:
+            items.append(item_schema.model_validate(item))
+        except ValidationError:
+            stats["invalid_items"] += 1
+            items.append(None)
+
+    stats["repaired" if repaired else "ok"] += 1
+    return items
+
+def parse_stats() -> dict:
+    return {f"{name}@{version}": dict(counts) for (name, version), counts in _parse_stats.items()}
@@ -0,0 +1,176 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from models.mood import ALLOWED_MOODS
+
+# The local tier never decides "Critical" - that is left to the
+# keyword screen and the LLM
+LOCAL_MOODS = [mood for mood in ALLOWED_MOODS if mood != "Critical"]
+
+TOKEN_RE = re.compile(r"[a-z']+")
+NEGATIONS = {"not", "no", "never", "don't", "dont", "isn't", "isnt", "wasn't", "wasnt", "can't", "cant", "hardly"}
+
+# Seed lexicon used until a model has been trained from chat_logs
+MOOD_LEXICON = {
+    "Happy": {"happy", "great", "glad", "joy", "joyful", "awesome", "amazing", "wonderful", "excited", "good", "love", "grateful"},
+    "Motivated": {"motivated", "productive", "determined", "focused", "inspired", "pumped", "ready", "goals", "energized"},
+    "Neutral": {"okay", "ok", "fine", "alright", "normal", "meh"},
+    "Sad": {"sad", "unhappy", "down", "lonely", "crying", "cry", "heartbroken", "depressed", "miss", "upset"},
+    "Stressed": {"stressed", "stress", "pressure", "deadline", "deadlines", "overwhelmed", "swamped", "busy"},
+    "Anxious": {"anxious", "anxiety", "nervous", "worried", "worry", "panic", "uneasy", "restless"},
+    "Angry": {"angry", "mad", "furious", "annoyed", "irritated", "frustrated", "hate", "rage"},
+    "Fear": {"scared", "afraid", "terrified", "frightened", "fear", "fearful"},
+    "Confused": {"confused", "lost", "unsure", "uncertain", "puzzled", "understand"},
+    "Burnout": {"burnout", "burned", "burnt", "exhausted", "tired", "drained", "exhausting", "worn"},
+}
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(text.lower())
+
+def _features(tokens: list) -> list:
+    """Tokens with negated words marked, e.g. 'not happy' -> 'not_happy'"""
+    features = []
+    negate = 0
+    for token in tokens:
+        if token in NEGATIONS:
+            negate = 2
+            continue
+        features.append(f"not_{token}" if negate else token)
+        negate = max(negate - 1, 0)
+    return features
+
+class LocalMoodClassifier:
+    """
+    CPU-only linear mood classifier.
+
+    A trained model is a multinomial naive Bayes (log-prior bias plus
+    per-token log-likelihood weights); without one it scores the seed
+    lexicon. predict() returns (mood, confidence) or (None, 0.0).
+    """
+
+    def __init__(self, weights: dict = None, bias: dict = None, default_weight: dict = None):
+        self.weights = weights or {}
+        self.bias = bias or {}
+        self.default_weight = default_weight or {}
+
+    @property
+    def trained(self) -> bool:
+        return bool(self.weights)
+
+    def predict(self, text: str) -> tuple:
+        features = _features(tokenize(text))
+        if not features:
+            return None, 0.0
+        if self.trained:
+            return self._predict_trained(features)
+        return self._predict_lexicon(features)
+
+    def _predict_trained(self, features: list) -> tuple:
+        known = [f for f in features if any(f in self.weights[m] for m in self.bias)]
+        if not known:
+            return None, 0.0
+
+        scores = {}
+        for mood, bias in self.bias.items():
+            weights = self.weights[mood]
+            default = self.default_weight[mood]
+            scores[mood] = bias + sum(weights.get(f, default) for f in known)
+
+        # Softmax over the linear scores
+        top = max(scores.values())
+        exp_scores = {mood: math.exp(score - top) for mood, score in scores.items()}
+        total = sum(exp_scores.values())
+        mood = max(exp_scores, key=exp_scores.get)
+
+        # Mostly-unknown messages are not "easy" even if the known words agree
+        coverage = len(known) / len(features)
+        return mood, round(exp_scores[mood] / total * min(1.0, 0.5 + coverage), 4)
+
+    def _predict_lexicon(self, features: list) -> tuple:
+        hits = Counter()
+        for feature in features:
+            for mood, words in MOOD_LEXICON.items():
+                if feature in words:
+                    hits[mood] += 1
+        if not hits:
+            return None, 0.0
+
+        mood, top = hits.most_common(1)[0]
+        confidence = top / sum(hits.values()) * min(1.0, 0.7 + 0.15 * top)
+        # One keyword is not enough to skip the LLM (and its Critical label):
+        # keep single-hit answers below any sensible threshold
+        if top < 2:
+            confidence = min(confidence, 0.6)
+        # Long messages carry more nuance than a word list can read
+        if len(features) > 12:
+            confidence *= 0.8
+        return mood, round(confidence, 4)
+
+    @classmethod
+    def train(cls, samples: list, smoothing: float = 1.0) -> "LocalMoodClassifier":
+        """Fit naive Bayes weights from (message, mood) pairs"""
+        token_counts = defaultdict(Counter)
+        doc_counts = Counter()
+        for message, mood in samples:
+            if mood not in LOCAL_MOODS:
+                continue
+            doc_counts[mood] += 1
+            token_counts[mood].update(_features(tokenize(message)))
+
+        vocabulary = set()
+        for counts in token_counts.values():
+            vocabulary.update(counts)
+
+        total_docs = sum(doc_counts.values())
+        weights, bias, default_weight = {}, {}, {}
+        for mood in doc_counts:
+            counts = token_counts[mood]
+            denominator = sum(counts.values()) + smoothing * len(vocabulary)
+            bias[mood] = math.log(doc_counts[mood] / total_docs)
+            weights[mood] = {
+                token: math.log((count + smoothing) / denominator)
+                for token, count in counts.items()
+            }
+            default_weight[mood] = math.log(smoothing / denominator)
+
+        return cls(weights, bias, default_weight)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "weights": self.weights,
+                "bias": self.bias,
+                "default_weight": self.default_weight
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalMoodClassifier":
+        """Load a trained model, or the lexicon-only model if none exists"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["weights"], data["bias"], data["default_weight"])
+
+async def load_labeled_messages(db, limit: int = 0, min_confidence: float = 0.6) -> list:
+    """
+    (message, mood) pairs from chat_logs labelled by the LLM.
+    Locally classified and fallback entries are skipped so the model
+    never trains on its own output.
+    """
+    cursor = db.chat_logs.find(
+        {
+            "mood": {"$in": LOCAL_MOODS},
+            "confidence": {"$gte": min_confidence},
+            "mood_source": {"$in": ["llm", None]}
+        },
+        {"message": 1, "mood": 1, "_id": 0}
+    ).sort("timestamp", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    return [(log["message"], log["mood"]) async for log in cursor]
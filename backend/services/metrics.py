@@ -0,0 +1,275 @@
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Minimal Prometheus-style metrics (text exposition format 0.0.4).
+# Updates are plain attribute arithmetic on the event loop thread - no
+# locks, no allocation once a label set has been seen. Every worker
+# process keeps its own values; scrape each worker (or add the pid as a
+# target label) when running more than one.
+
+NAMESPACE = "mindscope"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+_metrics = []
+_collectors = []
+
+def metric_name(name: str) -> str:
+    return _NAME_RE.sub("_", name).strip("_").lower()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        _metrics.append(self)
+
+    def labels(self, *values, **labels):
+        """Child for one label set; keep the result to skip the lookup on hot paths"""
+        key = values or tuple(labels[name] for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self._children[()]
+
+    def samples(self):
+        for key, child in self._children.items():
+            yield from child.samples(self.name, dict(zip(self.labelnames, key)))
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self, name: str, labels: dict):
+        yield name, labels, self.value
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def samples(self):
+        for key, child in self._children.items():
+            yield f"{self.name}_total", dict(zip(self.labelnames, key)), child.value
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    @contextmanager
+    def track_inprogress(self):
+        child = self._default()
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name: str, labels: dict):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+def register_stats(component: str, stats_fn):
+    """
+    Export an existing stats() dict as gauges at scrape time, e.g.
+    {"hits": 3, "circuit": {"trips": 1}} -> mindscope_<component>_hits,
+    mindscope_<component>_circuit_trips. Strings become a labelled 1
+    (state="closed"); None and other values are skipped.
+    """
+    _collectors.append((component, stats_fn))
+
+def _flatten(prefix: str, value, out: list):
+    if isinstance(value, bool):
+        out.append((prefix, {}, int(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, {}, value))
+    elif isinstance(value, str):
+        out.append((prefix, {prefix.rpartition("_")[2]: value}, 1))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}_{metric_name(str(key))}", item, out)
+
+def render() -> str:
+    """All metrics and registered stats in the Prometheus text format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    for component, stats_fn in _collectors:
+        try:
+            samples = []
+            _flatten(f"{NAMESPACE}_{metric_name(component)}", stats_fn(), samples)
+        except Exception as e:
+            print(f"Metrics collector {component} error: {e}")
+            continue
+        for name, labels, value in samples:
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+# Shared instruments used across services
+
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent in one stage of request handling (LLM calls, DB calls, auth)",
+    ("stage",)
+)
+
+def stage_timer(stage: str):
+    """with stage_timer("db_chat_logs_insert"): ... - observes STAGE_SECONDS"""
+    return STAGE_SECONDS.labels(stage).time()
+
+HTTP_REQUESTS = Counter("http_requests", "HTTP requests by route template and status", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+LLM_REQUESTS = Counter("llm_requests", "LLM calls by purpose and outcome", ("purpose", "outcome"))
+LLM_TOKENS = Counter("llm_tokens", "LLM tokens by purpose (estimated from characters)", ("purpose", "kind"))
+LLM_COST = Counter("llm_cost_usd", "Estimated LLM spend in USD", ("purpose",))
+
+JOBS = Counter("jobs", "Background jobs by name and outcome (ok, retried, failed, rejected)", ("job", "outcome"))
+JOB_LAG_SECONDS = Histogram("job_lag_seconds", "Time from a job becoming runnable to a worker starting it", ("job",))
+JOB_SECONDS = Histogram("job_duration_seconds", "Background job run time", ("job",))
+
+CHAT_LOGS_LOST = Counter("chat_logs_lost", "Write-behind chat logs dropped after every retry failed")
+
+MOOD_RESULTS = Counter("mood_classifications", "Mood classifications by tier (llm, local, cache, keyword, fallback)", ("source",))
+REPLY_FALLBACKS = Counter("reply_fallbacks", "Static replies served instead of an LLM reply", ("path",))
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: per-route latency histogram, status counter and
+    in-flight gauge. Routes are labelled by their template (/chat/history),
+    never the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_SECONDS.labels(scope["method"], path).observe(elapsed)
+            HTTP_REQUESTS.labels(scope["method"], path, status_code).inc()
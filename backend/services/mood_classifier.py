@@ -1,10 +1,19 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import json
+import re
+from datetime import datetime, timedelta
 from config import settings
-from models.mood import ALLOWED_MOODS, MOOD_THEMES, MOOD_SUGGESTIONS
-
-# Configure Gemini
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from database import get_database
+from models.mood import MOOD_QUOTES, MoodClassification, BatchMoodItem
+from services import llm_client
+from services.llm_client import LLMOverloadedError
+from services.local_classifier import LocalMoodClassifier
+from services.cache import TTLCache
+from services.shared_store import RedisStore, shared_backend_enabled
+from services.batcher import MicroBatcher
+from services.llm_parsing import LLMParseError, parse_llm_json, parse_llm_json_list, prompt_version
+from services.theme_mapper import presentation_for
 
 MOOD_DETECTION_PROMPT = """
 You are an emotion classification assistant for MindScope AI.
@@ -32,60 +41,274 @@ Output ONLY valid JSON:
 }}
 """
 
+BATCH_MOOD_PROMPT = """
+You are an emotion classification assistant for MindScope AI.
+
+Classify the emotional state of EACH of the {count} user messages below into exactly ONE of:
+Happy, Motivated, Neutral, Sad, Stressed, Anxious, Angry, Fear, Confused, Burnout
+
+Special Rule:
+- If a message contains self-harm, suicide, or emergency intent, classify it as "Critical"
+
+Rules:
+- No medical diagnosis
+- No new labels
+- Choose the closest emotion
+- Classify every message independently
+- Output JSON only
+
+Messages (JSON array of objects with "id" and "message"):
+{messages}
+
+Output ONLY a valid JSON array with one object per message, keeping each "id":
+[
+  {{"id": <id>, "mood": "<one label from the list>", "confidence": <number between 0.0 and 1.0>, "quote": "<one short motivational or supportive quote matching the mood>"}}
+]
+"""
+
+SINGLE_PROMPT_VERSION = prompt_version(MOOD_DETECTION_PROMPT)
+BATCH_PROMPT_VERSION = prompt_version(BATCH_MOOD_PROMPT)
+
+# Cache keys include the prompt version, so editing a prompt
+# invalidates every cached classification automatically
+PROMPT_VERSION = hashlib.sha256((MOOD_DETECTION_PROMPT + BATCH_MOOD_PROMPT).encode()).hexdigest()[:12]
+
+_classification_cache = TTLCache(settings.CLASSIFY_CACHE_SIZE, settings.CLASSIFY_CACHE_TTL)
+_shared_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+# Second tier shared by all workers: Redis when CACHE_BACKEND=redis,
+# otherwise the MongoDB collection if CLASSIFY_CACHE_SHARED is set
+_shared_store = RedisStore("classify", settings.CLASSIFY_CACHE_TTL) if shared_backend_enabled() else None
+
+# Self-harm / emergency screen - always runs before any other tier
+CRITICAL_PATTERN = re.compile(
+    r"suicid|kill(ing)? myself|end(ing)? (my|it all|my own) li(fe|ves)|"
+    r"self[- ]?harm|hurt(ing)? myself|cut(ting)? myself|want(ed)? to die|"
+    r"better off dead|no reason to live|(don'?t|do not) want to (live|be alive|wake up)|"
+    r"overdos|take my (own )?life|hate (myself|my life|being alive)|"
+    r"wish i (was|were) (dead|gone|never born)|never (been|was|were) born|"
+    r"(care|notice|miss me|matter|better|fine|happier|easier)\b.{0,20}\b(if|when|once) i('?m| am| was| were) "
+    r"(gone|dead|not (here|around))|(('?d|would|will) be|are|is) (better|fine|happier|easier)( off)? without me"
+    r"(?! (while|for|during|at|on|in|there|today|tonight|tomorrow|this|next))|"
+    r"better off without me|can'?t go on living",
+    re.IGNORECASE
+)
+
+_local_classifier = None
+_batcher = None
+
+def get_local_classifier() -> LocalMoodClassifier:
+    global _local_classifier
+    if _local_classifier is None:
+        _local_classifier = LocalMoodClassifier.load(settings.LOCAL_CLASSIFIER_PATH)
+    return _local_classifier
+
+def is_critical(message: str) -> bool:
+    return CRITICAL_PATTERN.search(message) is not None
+
+def normalize_message(message: str) -> str:
+    """Fold case, quotes, punctuation and spacing so near-identical messages match"""
+    text = message.lower().replace("\u2019", "'")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return " ".join(text.split())
+
+def classification_cache_key(message: str) -> str:
+    normalized = normalize_message(message)
+    return hashlib.sha256(f"{PROMPT_VERSION}:{normalized}".encode()).hexdigest()
+
+async def _get_cached_classification(key: str):
+    cached = _classification_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    if _shared_store is not None:
+        cached = await _shared_store.get(key)
+        if cached is not None:
+            cached = tuple(cached)
+            _classification_cache.set(key, cached)
+        return cached
+    
+    if not settings.CLASSIFY_CACHE_SHARED:
+        return None
+    
+    try:
+        doc = await get_database().classification_cache.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"mood": 1, "confidence": 1, "quote": 1}
+        )
+    except Exception as e:
+        print(f"Shared classification cache error: {e}")
+        _shared_stats["errors"] += 1
+        return None
+    
+    if doc is None:
+        _shared_stats["misses"] += 1
+        return None
+    
+    _shared_stats["hits"] += 1
+    cached = (doc["mood"], doc["confidence"], doc["quote"])
+    _classification_cache.set(key, cached)
+    return cached
+
+async def _store_classification(key: str, mood_result: dict):
+    # Only the classification is cached - never the personalized reply
+    cached = (mood_result["mood"], mood_result["confidence"], mood_result["quote"])
+    _classification_cache.set(key, cached)
+    if _shared_store is not None:
+        await _shared_store.set(key, cached)
+        return
+    if not settings.CLASSIFY_CACHE_SHARED:
+        return
+    
+    try:
+        await get_database().classification_cache.update_one(
+            {"_id": key},
+            {"$set": {
+                "mood": cached[0],
+                "confidence": cached[1],
+                "quote": cached[2],
+                "prompt_version": PROMPT_VERSION,
+                "expires_at": datetime.utcnow() + timedelta(seconds=settings.CLASSIFY_CACHE_TTL)
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Shared classification cache error: {e}")
+        _shared_stats["errors"] += 1
+
+def classification_cache_stats() -> dict:
+    return {
+        **_classification_cache.stats(),
+        "prompt_version": PROMPT_VERSION,
+        "shared": _shared_store.stats() if _shared_store is not None
+            else dict(_shared_stats) if settings.CLASSIFY_CACHE_SHARED else None
+    }
+
+def build_mood_result(mood: str, confidence: float, quote: str, source: str = "llm") -> dict:
+    """Attach the mood's shared, precomputed presentation (theme, suggestions)"""
+    return {
+        "mood": mood,
+        "confidence": confidence,
+        "quote": quote,
+        "presentation": presentation_for(mood),
+        "source": source
+    }
+
+def mood_result_from(classification: MoodClassification) -> dict:
+    """Mood result for a schema-validated LLM classification"""
+    return build_mood_result(
+        classification.mood,
+        classification.confidence,
+        classification.quote
+    )
+
+def fallback_mood_result() -> dict:
+    """Neutral classification used when the LLM call fails"""
+    return build_mood_result("Neutral", 0.5, "Take a moment to breathe.", source="fallback")
+
+async def _classify_single(message: str) -> MoodClassification:
+    """One-message LLM classification, validated against the schema"""
+    prompt = MOOD_DETECTION_PROMPT.format(message=message)
+    
+    response_text = await llm_client.generate(prompt, purpose="classify")
+    
+    return parse_llm_json(response_text, MoodClassification, "mood_detection", SINGLE_PROMPT_VERSION)
+
+async def _classify_batch(messages: list) -> list:
+    """
+    One multi-message prompt for a micro-batch. Items that come back
+    missing or invalid are retried on their own.
+    """
+    if len(messages) == 1:
+        return [await _classify_single(messages[0])]
+    
+    payload = json.dumps(
+        [{"id": i, "message": message} for i, message in enumerate(messages)],
+        ensure_ascii=False
+    )
+    response_text = await llm_client.generate(
+        BATCH_MOOD_PROMPT.format(count=len(messages), messages=payload),
+        purpose="classify_batch"
+    )
+    
+    try:
+        items = parse_llm_json_list(response_text, BatchMoodItem, "mood_batch", BATCH_PROMPT_VERSION)
+    except LLMParseError as e:
+        print(f"Batch classification parse error: {e}")
+        items = []
+    
+    by_id = {}
+    for item in items:
+        if item is not None:
+            by_id.setdefault(item.id, item)
+    
+    results = [by_id.get(i) for i in range(len(messages))]
+    retry = [i for i, result in enumerate(results) if result is None]
+    
+    if retry:
+        retried = await asyncio.gather(
+            *(_classify_single(messages[i]) for i in retry),
+            return_exceptions=True
+        )
+        for i, result in zip(retry, retried):
+            results[i] = result
+    
+    return results
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _classify_batch,
+            window=settings.CLASSIFY_BATCH_WINDOW_MS / 1000,
+            max_size=settings.CLASSIFY_BATCH_MAX_SIZE
+        )
+    return _batcher
+
+def classify_locally(message: str):
+    """
+    LLM-free tiers: the self-harm screen, then the local classifier.
+    Returns a mood result, or None when the LLM has to decide.
+    """
+    if is_critical(message):
+        return build_mood_result("Critical", 1.0, MOOD_QUOTES["Critical"], source="keyword")
+    
+    if not settings.LOCAL_CLASSIFIER_ENABLED:
+        return None
+    
+    mood, confidence = get_local_classifier().predict(message)
+    if mood is None or confidence < settings.LOCAL_CLASSIFIER_THRESHOLD:
+        return None
+    
+    return build_mood_result(mood, confidence, MOOD_QUOTES[mood], source="local")
+
 async def classify_mood(message: str) -> dict:
     """
     Classify user message into one of the allowed moods
     Returns mood, confidence, theme info, and suggestions
     """
+    local_result = classify_locally(message)
+    if local_result is not None:
+        return local_result
+    
+    cache_key = classification_cache_key(message)
+    cached = await _get_cached_classification(cache_key)
+    if cached is not None:
+        return build_mood_result(*cached, source="cache")
+    
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        prompt = MOOD_DETECTION_PROMPT.format(message=message)
-        
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean response - remove markdown if present
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        response_text = response_text.strip()
-        
-        # Parse JSON
-        result = json.loads(response_text)
-        
-        # Validate mood
-        mood = result.get("mood", "Neutral")
-        if mood not in ALLOWED_MOODS:
-            mood = "Neutral"
-        
-        confidence = float(result.get("confidence", 0.7))
-        quote = result.get("quote", "Every moment is a fresh beginning.")
-        
-        # Get theme and suggestions
-        theme_info = MOOD_THEMES.get(mood, MOOD_THEMES["Neutral"])
-        suggestions = MOOD_SUGGESTIONS.get(mood, MOOD_SUGGESTIONS["Neutral"])
+        if settings.CLASSIFY_BATCH_ENABLED:
+            result = await get_batcher().submit(message)
+        else:
+            result = await _classify_single(message)
         
-        return {
-            "mood": mood,
-            "confidence": confidence,
-            "quote": quote,
-            "ui_theme": theme_info["theme"],
-            "background_gradient": theme_info["gradient"],
-            "emoji": theme_info["emoji"],
-            "suggestions": suggestions
-        }
+        mood_result = mood_result_from(result)
+        await _store_classification(cache_key, mood_result)
+        return mood_result
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"Mood classification error: {e}")
         # Fallback to neutral
-        return {
-            "mood": "Neutral",
-            "confidence": 0.5,
-            "quote": "Take a moment to breathe.",
-            "ui_theme": "light",
-            "background_gradient": MOOD_THEMES["Neutral"]["gradient"],
-            "emoji": "😐",
-            "suggestions": MOOD_SUGGESTIONS["Neutral"]
-        }
\ No newline at end of file
+        return fallback_mood_result()
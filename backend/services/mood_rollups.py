@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.mood import MOOD_SCORES
+
+# One mood_daily document per (user_id, date):
+# {user_id, date: "YYYY-MM-DD", counts: {mood: n}, score_sum, total}
+
+DUPLICATE_KEY = 11000
+
+def rollup_date(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%d")
+
+async def record_mood(db, user_id, mood: str, timestamp: datetime):
+    """Add one chat log to the user's daily rollup"""
+    await db.mood_daily.update_one(
+        {"user_id": user_id, "date": rollup_date(timestamp)},
+        {"$inc": {
+            f"counts.{mood}": 1,
+            "score_sum": MOOD_SCORES.get(mood, 0),
+            "total": 1
+        }},
+        upsert=True
+    )
+
+async def record_moods(db, chat_logs: list):
+    """Fold a batch of chat logs into the rollups, one update per user-day"""
+    increments = {}
+    for log in chat_logs:
+        key = (log["user_id"], rollup_date(log["timestamp"]))
+        inc = increments.setdefault(key, {"score_sum": 0, "total": 0})
+        inc[f"counts.{log['mood']}"] = inc.get(f"counts.{log['mood']}", 0) + 1
+        inc["score_sum"] += MOOD_SCORES.get(log["mood"], 0)
+        inc["total"] += 1
+    
+    if increments:
+        await db.mood_daily.bulk_write([
+            UpdateOne({"user_id": user_id, "date": date}, {"$inc": inc}, upsert=True)
+            for (user_id, date), inc in increments.items()
+        ], ordered=False)
+
+async def load_daily_counts(db, user_id, start_date: datetime, end_date: datetime = None) -> dict:
+    """Per-day mood Counters for the user, keyed by date string"""
+    date_range = {"$gte": rollup_date(start_date)}
+    if end_date is not None:
+        date_range["$lte"] = rollup_date(end_date)
+    
+    cursor = db.mood_daily.find(
+        {"user_id": user_id, "date": date_range},
+        {"date": 1, "counts": 1, "_id": 0}
+    )
+    
+    return {doc["date"]: Counter(doc.get("counts", {})) async for doc in cursor}
+
+async def backfill_rollups(db, user_id=None, cutoff: datetime = None, batch_size: int = 1000) -> int:
+    """
+    Rebuild mood_daily from chat_logs (all users, or one user) while live
+    writes keep running. Returns the number of rollup documents written.
+
+    Live writes only $inc the current day, so days before the cutoff's
+    day are replaced outright. On the cutoff day the logs older than the
+    cutoff are added with $inc, once per rollup document; newer ones are
+    counted by the live writes. Pass the time live rollup writes started
+    (the deploy). The default, midnight UTC today, rebuilds finished days
+    and leaves today alone; with writes stopped, datetime.max rebuilds all.
+    """
+    if cutoff is None:
+        cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff_date = rollup_date(cutoff)
+    
+    match = {"timestamp": {"$lt": cutoff}}
+    if user_id is not None:
+        match["user_id"] = user_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "mood": "$mood"
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id.user_id": 1, "_id.date": 1}}
+    ]
+    
+    operations = []
+    written = 0
+    
+    async def flush():
+        nonlocal operations, written
+        if operations:
+            written += len(operations)
+            try:
+                await db.mood_daily.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # A cutoff day backfilled by an earlier run: its upsert hits user_date_unique
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                written -= len(errors)
+            operations = []
+    
+    def rollup_operation(key: tuple, counts: Counter):
+        if key[1] == cutoff_date:
+            return _rollup_increment(key, counts)
+        return _rollup_replacement(key, counts)
+    
+    # Rows arrive sorted by (user, date), so each day is complete
+    # as soon as the key changes
+    current_key, counts = None, Counter()
+    async for row in db.chat_logs.aggregate(pipeline, allowDiskUse=True):
+        key = (row["_id"]["user_id"], row["_id"]["date"])
+        if key != current_key and current_key is not None:
+            operations.append(rollup_operation(current_key, counts))
+            counts = Counter()
+            if len(operations) >= batch_size:
+                await flush()
+        current_key = key
+        counts[row["_id"]["mood"]] += row["count"]
+    
+    if current_key is not None:
+        operations.append(rollup_operation(current_key, counts))
+    await flush()
+    
+    return written
+
+def _rollup_increment(key: tuple, counts: Counter) -> UpdateOne:
+    """Add the cutoff day's older logs on top of the live counts, unless already added"""
+    user_id, date = key
+    inc = {f"counts.{mood}": n for mood, n in counts.items()}
+    inc["score_sum"] = sum(MOOD_SCORES.get(mood, 0) * n for mood, n in counts.items())
+    inc["total"] = sum(counts.values())
+    return UpdateOne(
+        {"user_id": user_id, "date": date, "backfilled": {"$ne": True}},
+        {"$inc": inc, "$set": {"backfilled": True}},
+        upsert=True
+    )
+
+def _rollup_replacement(key: tuple, counts: Counter) -> ReplaceOne:
+    user_id, date = key
+    return ReplaceOne(
+        {"user_id": user_id, "date": date},
+        {
+            "user_id": user_id,
+            "date": date,
+            "counts": dict(counts),
+            "score_sum": sum(MOOD_SCORES.get(mood, 0) * n for mood, n in counts.items()),
+            "total": sum(counts.values())
+        },
+        upsert=True
+    )
@@ -0,0 +1,207 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from config import settings
+from models.mood import MOOD_SCORES
+from services.mood_rollups import rollup_date
+
+# Vectorized mood trends. Daily data for one user or a whole cohort is
+# loaded into [users x days] arrays (mean mood score per day, NaN when
+# the user logged nothing, and entry counts); every metric is then a few
+# array operations over all users at once instead of a Python loop per day.
+
+@dataclass
+class DailySeries:
+    user_ids: list        # row labels (str)
+    dates: list           # column labels, "YYYY-MM-DD", oldest first
+    scores: np.ndarray    # float [users, days], mean mood score, NaN = no entries
+    entries: np.ndarray   # int [users, days]
+
+def _score_expression() -> dict:
+    """Aggregation expression mapping $mood to its MOOD_SCORES value"""
+    return {"$switch": {
+        "branches": [{"case": {"$eq": ["$mood", mood]}, "then": score} for mood, score in MOOD_SCORES.items()],
+        "default": 0
+    }}
+
+async def load_daily_series(db, user_ids: list, days: int, end_date: datetime = None) -> DailySeries:
+    """
+    Last `days` days (ending with end_date's day) for every user in one
+    query, from the mood_daily rollups or a $group over chat_logs
+    """
+    end_date = end_date or datetime.utcnow()
+    start_date = end_date - timedelta(days=days - 1)
+    dates = [rollup_date(start_date + timedelta(days=i)) for i in range(days)]
+    user_ids = [str(user_id) for user_id in user_ids]
+    object_ids = [ObjectId(user_id) for user_id in user_ids]
+
+    if settings.ANALYTICS_USE_ROLLUPS:
+        cursor = db.mood_daily.find(
+            {"user_id": {"$in": object_ids}, "date": {"$gte": dates[0], "$lte": dates[-1]}},
+            {"_id": 0, "user_id": 1, "date": 1, "score_sum": 1, "total": 1}
+        )
+    else:
+        cursor = db.chat_logs.aggregate([
+            {"$match": {
+                "user_id": {"$in": object_ids},
+                "timestamp": {"$gte": datetime.strptime(dates[0], "%Y-%m-%d")}
+            }},
+            {"$project": {"_id": 0, "user_id": 1, "mood": 1, "timestamp": 1}},
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}
+                },
+                "score_sum": {"$sum": _score_expression()},
+                "total": {"$sum": 1}
+            }},
+            {"$project": {"user_id": "$_id.user_id", "date": "$_id.date", "score_sum": 1, "total": 1}}
+        ])
+
+    row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+    column_of = {date: column for column, date in enumerate(dates)}
+    rows, columns, score_sums, totals = [], [], [], []
+    async for doc in cursor:
+        column = column_of.get(doc["date"])
+        if column is None or not doc.get("total"):
+            continue
+        rows.append(row_of[str(doc["user_id"])])
+        columns.append(column)
+        score_sums.append(doc.get("score_sum", 0))
+        totals.append(doc["total"])
+
+    entries = np.zeros((len(user_ids), days), dtype=np.int64)
+    sums = np.zeros((len(user_ids), days), dtype=np.float64)
+    entries[rows, columns] = totals
+    sums[rows, columns] = score_sums
+    scores = np.full(entries.shape, np.nan)
+    np.divide(sums, entries, out=scores, where=entries > 0)
+    return DailySeries(user_ids, dates, scores, entries)
+
+def rolling_mean(scores: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the non-NaN scores in the trailing `window` days, per column"""
+    active = ~np.isnan(scores)
+    padding = ((0, 0), (1, 0))
+    sums = np.pad(np.cumsum(np.where(active, scores, 0.0), axis=1), padding)
+    counts = np.pad(np.cumsum(active, axis=1), padding)
+    starts = np.maximum(np.arange(1, scores.shape[1] + 1) - window, 0)
+    window_sums = sums[:, 1:] - sums[:, starts]
+    window_counts = counts[:, 1:] - counts[:, starts]
+    result = np.full(scores.shape, np.nan)
+    np.divide(window_sums, window_counts, out=result, where=window_counts > 0)
+    return result
+
+def run_lengths(flags: np.ndarray) -> np.ndarray:
+    """Length of the run of True values ending at each column"""
+    totals = np.cumsum(flags, axis=1)
+    # Running total at the most recent False, carried forward
+    resets = np.maximum.accumulate(np.where(flags, 0, totals), axis=1)
+    return totals - resets
+
+def _nanmean(values: np.ndarray, axis: int = 1) -> np.ndarray:
+    counts = np.sum(~np.isnan(values), axis=axis)
+    sums = np.nansum(values, axis=axis)
+    result = np.full(counts.shape, np.nan)
+    np.divide(sums, counts, out=result, where=counts > 0)
+    return result
+
+def _slope(scores: np.ndarray) -> np.ndarray:
+    """Least-squares score change per day over the active days of each row"""
+    active = ~np.isnan(scores)
+    x = np.broadcast_to(np.arange(scores.shape[1], dtype=np.float64), scores.shape)
+    counts = active.sum(axis=1)
+    safe_counts = np.maximum(counts, 1)
+    x_mean = np.where(active, x, 0).sum(axis=1) / safe_counts
+    y_mean = np.nansum(scores, axis=1) / safe_counts
+    dx = np.where(active, x - x_mean[:, None], 0.0)
+    dy = np.where(active, scores - y_mean[:, None], 0.0)
+    denominator = (dx * dx).sum(axis=1)
+    result = np.full(counts.shape, np.nan)
+    np.divide((dx * dy).sum(axis=1), denominator, out=result, where=denominator > 0)
+    return result
+
+def trend_metrics(series: DailySeries, smooth: int = 7) -> dict:
+    """
+    Per-user metric arrays, all computed for every row at once:
+    rolling (smoothed daily score), average, volatility (std of daily
+    scores), slope per week, week-over-week delta, current and longest
+    logging streaks and the longest run of negative-score days
+    """
+    scores, entries = series.scores, series.entries
+    active = entries > 0
+    days = scores.shape[1]
+
+    average = _nanmean(scores)
+    squared = np.where(active, (scores - average[:, None]) ** 2, np.nan)
+    volatility = np.sqrt(_nanmean(squared))
+
+    if days >= 14:
+        week_over_week = _nanmean(scores[:, -7:]) - _nanmean(scores[:, -14:-7])
+    else:
+        week_over_week = np.full(len(series.user_ids), np.nan)
+
+    logging_runs = run_lengths(active)
+    # Today may not have an entry yet; a streak through yesterday still counts
+    current_streak = logging_runs[:, -1]
+    if days >= 2:
+        current_streak = np.where(active[:, -1], logging_runs[:, -1], logging_runs[:, -2])
+
+    return {
+        "rolling": rolling_mean(scores, smooth),
+        "average_score": average,
+        "volatility": volatility,
+        "slope_per_week": _slope(scores) * 7,
+        "week_over_week": week_over_week,
+        "active_days": active.sum(axis=1),
+        "total_entries": entries.sum(axis=1),
+        "current_streak": current_streak,
+        "longest_streak": logging_runs.max(axis=1, initial=0),
+        "longest_low_streak": run_lengths(active & (np.nan_to_num(scores) < 0)).max(axis=1, initial=0),
+    }
+
+def _number(value, digits: int = 2):
+    """JSON-safe scalar: NaN becomes None, numpy types become Python ones"""
+    value = float(value)
+    if np.isnan(value):
+        return None
+    return round(value, digits)
+
+def user_trend(series: DailySeries, metrics: dict, row: int = 0) -> dict:
+    """Response payload for one user's row"""
+    daily = [
+        {"date": date, "score": _number(score), "rolling": _number(rolling), "entries": int(count)}
+        for date, score, rolling, count in zip(
+            series.dates, series.scores[row], metrics["rolling"][row], series.entries[row]
+        )
+    ]
+    summary = {
+        name: _number(metrics[name][row])
+        for name in ("average_score", "volatility", "slope_per_week", "week_over_week")
+    }
+    summary.update({
+        name: int(metrics[name][row])
+        for name in ("active_days", "total_entries", "current_streak", "longest_streak", "longest_low_streak")
+    })
+    return {"daily": daily, "summary": summary}
+
+def cohort_stats(series: DailySeries, metrics: dict) -> dict:
+    """Distribution of the per-user metrics across the cohort"""
+    engaged = metrics["active_days"] > 0
+    stats = {"users": len(series.user_ids), "active_users": int(engaged.sum())}
+    for name in ("average_score", "volatility", "slope_per_week", "week_over_week"):
+        values = metrics[name][engaged]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            stats[name] = None
+            continue
+        p25, p50, p75 = np.percentile(values, [25, 50, 75])
+        stats[name] = {"mean": _number(values.mean()), "p25": _number(p25), "p50": _number(p50), "p75": _number(p75)}
+
+    slopes = metrics["slope_per_week"][engaged]
+    stats["declining_users"] = int(np.sum(slopes < -settings.TREND_DECLINE_THRESHOLD))
+    stats["daily_average"] = [_number(value) for value in _nanmean(series.scores, axis=0)]
+    stats["daily_active_users"] = [int(value) for value in (series.entries > 0).sum(axis=0)]
+    return stats
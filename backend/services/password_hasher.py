@@ -0,0 +1,39 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+from config import settings
+
+# Pinning min/max rounds to the configured cost makes passlib flag
+# hashes made with any other cost, so they are upgraded on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop while capping how many cores a login storm can use
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> tuple:
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash
+    uses an outdated cost factor and should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+def shutdown():
+    _executor.shutdown(wait=True)
@@ -0,0 +1,31 @@
+from services.shared_store import create_store
+
+class RateLimiter:
+    """
+    Fixed-window request counter per key (IP, email, ...), kept in a
+    shared store so every worker counts against the same limit.
+    Keys expire with their window, so memory stays bounded.
+    """
+
+    def __init__(self, limit: int, window: float, namespace: str = "ratelimit", max_keys: int = 100000):
+        self.limit = limit
+        self.window = window
+        self._windows = create_store(namespace, max_keys, window)
+        self.rejected = 0
+
+    async def hit(self, key: str) -> float:
+        """
+        Count one request. Returns 0 when allowed, otherwise the
+        seconds until the key's window resets.
+        """
+        count, reset_in = await self._windows.incr(key, self.window)
+        if count > self.limit:
+            self.rejected += 1
+            return reset_in
+        return 0.0
+
+    async def reset(self, key: str):
+        await self._windows.delete(key)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "window": self.window, "rejected": self.rejected, **self._windows.stats()}
@@ -0,0 +1,147 @@
+import asyncio
+import random
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while the circuit is open"""
+
+def is_retryable(error: Exception) -> bool:
+    """Transient backend trouble: timeouts, connection errors, 429/5xx"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return False
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `recovery_time` seconds, letting one probe
+    through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_time: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuited = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                self.short_circuited += 1
+                raise CircuitOpenError("LLM backend circuit is open")
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                self.short_circuited += 1
+                raise CircuitOpenError("LLM backend circuit is half-open, probe in flight")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Call finished without telling us anything about backend health"""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+            "retry_in": round(max(self.recovery_time - (time.monotonic() - self.opened_at), 0.0), 1)
+                if self.state == "open" else 0.0
+        }
+
+async def _hedged_attempt(make_call, timeout: float, hedge_after: float, stats: dict):
+    """
+    Start a second identical call if the first has not answered after
+    `hedge_after` seconds; the first success wins, the loser is cancelled
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = {asyncio.ensure_future(make_call())}
+    hedge = None
+    error = None
+    try:
+        while pending:
+            wait_for = deadline - loop.time()
+            if hedge is None:
+                wait_for = min(wait_for, hedge_after)
+            done, pending = await asyncio.wait(pending, timeout=max(wait_for, 0), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        stats["hedge_wins"] += 1
+                    return task.result()
+                error = task.exception()
+
+            if loop.time() >= deadline:
+                raise asyncio.TimeoutError()
+            if hedge is None and pending:
+                stats["hedges"] += 1
+                hedge = asyncio.ensure_future(make_call())
+                pending.add(hedge)
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def call_with_retries(
+    make_call,
+    deadline: float,
+    max_attempts: int,
+    attempt_timeout: float,
+    base_delay: float,
+    max_delay: float,
+    hedge_after: float,
+    stats: dict
+):
+    """
+    Deadline-aware retries with jittered exponential backoff. A retry is
+    only started if its backoff still fits inside the overall deadline.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        timeout = min(attempt_timeout, end - loop.time())
+        if timeout <= 0:
+            raise asyncio.TimeoutError("LLM deadline exceeded")
+        try:
+            if hedge_after and hedge_after < timeout:
+                return await _hedged_attempt(make_call, timeout, hedge_after, stats)
+            return await asyncio.wait_for(make_call(), timeout=timeout)
+        except Exception as e:
+            if attempt >= max_attempts or not is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            if loop.time() + delay >= end:
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import secrets
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from services.shared_store import create_store
+
+# Per-user cache of encoded JSON responses (analytics, chat history).
+# Entries are keyed "<user_id>:<view>" and tagged with the user's write
+# version; saving a chat log bumps the version, which orphans every
+# cached view of that user at once without a read-modify-write. Each
+# entry carries a strong ETag so polling clients get a 304 instead of
+# the body when nothing has changed.
+
+_responses = create_store("responses", settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+_versions = create_store("write_version", settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+def _new_version() -> str:
+    # Random rather than a counter: a version evicted from the store can
+    # never come back to the same value and revive old entries
+    return secrets.token_hex(8)
+
+async def current_version(user_id: str) -> str:
+    version = await _versions.get(str(user_id))
+    if version is None:
+        version = _new_version()
+        await _versions.set(str(user_id), version)
+    return version
+
+async def bump_version(*user_ids):
+    """Called after a user's chat logs change; their cached views go stale"""
+    for user_id in user_ids:
+        await _versions.set(str(user_id), _new_version())
+
+def encode_json(payload) -> str:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+async def cached_response(request: Request, user_id: str, view: str, build, cache: bool = True) -> Response:
+    """
+    Serve `view` for the user from the cache, or `await build()` (a dict)
+    and cache it. Answers 304 when If-None-Match has the current ETag.
+    Pass cache=False for views built from secondary reads: one built
+    just after a write could predate it yet be stored under the new
+    version, and would be served until the next write.
+    """
+    cache = cache and settings.RESPONSE_CACHE_TTL > 0
+    entry = None
+    if cache:
+        key = f"{user_id}:{view}"
+        version = await current_version(user_id)
+        entry = await _responses.get(key)
+        if entry is not None and entry["version"] != version:
+            entry = None
+
+    if entry is None:
+        _stats["misses"] += 1
+        body = encode_json(await build())
+        entry = {"body": body, "etag": make_etag(body)}
+        if cache:
+            await _responses.set(key, {**entry, "version": version})
+    else:
+        _stats["hits"] += 1
+
+    # no-cache: clients may keep the body but must revalidate on every poll
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(request, entry["etag"]):
+        _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+def response_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        "store": _responses.stats()
+    }
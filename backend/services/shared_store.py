@@ -0,0 +1,150 @@
+import json
+import time
+
+from config import settings
+from services.cache import TTLCache
+
+# Key/value stores behind the caches and limiters that must agree across
+# worker processes. CACHE_BACKEND=memory keeps everything per process
+# (fine for a single worker); CACHE_BACKEND=redis shares it through any
+# Redis-compatible server (Redis, Valkey, KeyDB, ...).
+
+_redis = None
+
+def get_redis():
+    """Lazily created client, so each worker process opens its own pool"""
+    global _redis
+    if _redis is None:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package: pip install redis")
+        _redis = redis.from_url(settings.REDIS_URL)
+    return _redis
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        close = getattr(_redis, "aclose", None) or _redis.close
+        await close()
+        _redis = None
+
+def shared_backend_enabled() -> bool:
+    return settings.CACHE_BACKEND == "redis"
+
+class MemoryStore:
+    """Per-process store on top of TTLCache"""
+
+    shared = False
+
+    def __init__(self, namespace: str, max_size: int, ttl: float):
+        self.namespace = namespace
+        self._cache = TTLCache(max_size, ttl)
+
+    async def get(self, key: str):
+        return self._cache.get(key)
+
+    async def set(self, key: str, value, ttl: float = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._cache.delete(key)
+
+    async def incr(self, key: str, window: float) -> tuple:
+        """Fixed-window counter: (count in window, seconds until it resets)"""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is None or now - entry[0] >= window:
+            entry = [now, 0]
+            self._cache.set(key, entry, ttl=window)
+        entry[1] += 1
+        return entry[1], max(window - (now - entry[0]), 0.0)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+class RedisStore:
+    """
+    Store shared by every worker. Values are JSON encoded. Connection
+    errors are logged and treated as a miss (get) or an allowed request
+    (incr) so a Redis outage degrades to uncached, unlimited service.
+    """
+
+    shared = True
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{settings.REDIS_KEY_PREFIX}:{self.namespace}:{key}"
+
+    def _error(self, operation: str, error: Exception):
+        self.errors += 1
+        print(f"Shared store {self.namespace} {operation} error: {error}")
+
+    async def get(self, key: str):
+        try:
+            raw = await get_redis().get(self._key(key))
+        except Exception as e:
+            self._error("get", e)
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value, ttl: float = None):
+        milliseconds = max(int((self.ttl if ttl is None else ttl) * 1000), 1)
+        try:
+            await get_redis().set(self._key(key), json.dumps(value), px=milliseconds)
+        except Exception as e:
+            self._error("set", e)
+
+    async def delete(self, *keys: str):
+        if not keys:
+            return
+        try:
+            await get_redis().delete(*(self._key(key) for key in keys))
+        except Exception as e:
+            self._error("delete", e)
+
+    async def incr(self, key: str, window: float) -> tuple:
+        """Fixed-window counter: (count in window, seconds until it resets)"""
+        redis_key = self._key(key)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.incr(redis_key)
+                pipe.pttl(redis_key)
+                count, remaining_ms = await pipe.execute()
+            if remaining_ms < 0:
+                # First hit in the window (or a lost expiry): start the window now
+                remaining_ms = int(window * 1000)
+                await get_redis().pexpire(redis_key, remaining_ms)
+        except Exception as e:
+            self._error("incr", e)
+            return 0, 0.0
+        return count, remaining_ms / 1000
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def create_store(namespace: str, max_size: int, ttl: float):
+    """Store for the configured CACHE_BACKEND; max_size only bounds the memory backend"""
+    if shared_backend_enabled():
+        get_redis()  # fail at startup if the redis package is missing
+        return RedisStore(namespace, ttl)
+    return MemoryStore(namespace, max_size, ttl)
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import orjson
+
+from models.mood import ALLOWED_MOODS, MOOD_THEMES, MOOD_SUGGESTIONS
+
+# Per-mood presentation (UI theme, gradient, emoji, suggestions) built once
+# at import. The payloads are immutable and shared by every request; the
+# "ui" and "suggestions" parts of a chat response are pre-serialized
+# orjson Fragments, spliced into the response bytes without being walked
+# or re-encoded.
+
+@dataclass(frozen=True)
+class MoodPresentation:
+    mood: str
+    theme: str
+    gradient: str
+    emoji: str
+    places: tuple
+    music_mood: str
+    ui_json: orjson.Fragment
+    suggestions_json: orjson.Fragment
+
+def _build(mood: str) -> MoodPresentation:
+    theme = MOOD_THEMES[mood]
+    suggestions = MOOD_SUGGESTIONS[mood]
+    return MoodPresentation(
+        mood=mood,
+        theme=theme["theme"],
+        gradient=theme["gradient"],
+        emoji=theme["emoji"],
+        places=tuple(suggestions["places"]),
+        music_mood=suggestions["music_mood"],
+        ui_json=orjson.Fragment(orjson.dumps({"theme": theme["theme"], "background_gradient": theme["gradient"]})),
+        suggestions_json=orjson.Fragment(orjson.dumps(suggestions)),
+    )
+
+PRESENTATIONS = MappingProxyType({mood: _build(mood) for mood in ALLOWED_MOODS})
+
+def presentation_for(mood: str) -> MoodPresentation:
+    """Shared presentation for a mood (Neutral for anything unknown)"""
+    return PRESENTATIONS.get(mood) or PRESENTATIONS["Neutral"]